@@ -1,42 +1,47 @@
 """
-Middleware de rate limiting usando Redis.
+Rate limiting usando Redis: dependency FastAPI para rotas expostas (webhook).
 """
 
 from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
 from loguru import logger
 
 from app.config.redis_client import redis_client
 
+MAX_REQUESTS = 30  # Por minuto
+WINDOW_SECONDS = 60
+
+# INCR + EXPIRE atômico no servidor (um round-trip, sem chave órfã sem TTL).
+# register_script usa EVALSHA e faz fallback para SCRIPT LOAD em NOSCRIPT.
+RATE_LIMIT_LUA = """
+local current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return current
+"""
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Rate limiting por IP/número do WhatsApp."""
-
-    MAX_REQUESTS = 30  # Por minuto
-    WINDOW_SECONDS = 60
-
-    async def dispatch(self, request: Request, call_next):
-        # Só aplicar rate limit no webhook POST
-        if request.url.path == "/webhook" and request.method == "POST":
-            client_ip = request.client.host if request.client else "unknown"
-            key = f"rate:{client_ip}"
-
-            try:
-                current = await redis_client.incr(key)
-                if current == 1:
-                    await redis_client.expire(key, self.WINDOW_SECONDS)
-
-                if current > self.MAX_REQUESTS:
-                    logger.warning(f"Rate limit excedido para {client_ip}")
-                    raise HTTPException(
-                        status_code=429,
-                        detail="Too many requests. Try again later.",
-                    )
-            except HTTPException:
-                raise
-            except Exception as e:
-                # Se o Redis estiver down, permitir (fail open)
-                logger.warning(f"Rate limit check falhou (Redis): {e}")
-
-        response = await call_next(request)
-        return response
+_rate_limit_script = redis_client.register_script(RATE_LIMIT_LUA)
+
+
+async def rate_limit(request: Request) -> None:
+    """
+    FastAPI dependency — rate limiting por IP.
+    Use como: @router.post(..., dependencies=[Depends(rate_limit)])
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    key = f"rate:{client_ip}"
+
+    try:
+        current = await _rate_limit_script(keys=[key], args=[WINDOW_SECONDS])
+
+        if current > MAX_REQUESTS:
+            logger.warning(f"Rate limit excedido para {client_ip}")
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests. Try again later.",
+            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        # Se o Redis estiver down, permitir (fail open)
+        logger.warning(f"Rate limit check falhou (Redis): {e}")
@@ -0,0 +1,22 @@
+"""
+Classe de resposta JSON padrão da API, serializada com orjson.
+
+Substitui o `fastapi.responses.ORJSONResponse` (depreciado no FastAPI) sem
+mudar o comportamento: o corpo já chega pronto pelo jsonable_encoder ou pelo
+response_model, e o orjson só gera os bytes.
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse que serializa com orjson (C/Rust) em vez de json.dumps."""
+
+    def render(self, content: Any) -> bytes:
+        # default=str cobre tipos fora do orjson (ex.: Decimal) sem quebrar a resposta
+        return orjson.dumps(content, default=str, option=_ORJSON_OPTIONS)
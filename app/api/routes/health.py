@@ -2,23 +2,28 @@
 Rota de health check.
 """
 
-from fastapi import APIRouter
+import orjson
+from fastapi import APIRouter, Response
 
 router = APIRouter(tags=["health"])
 
+# Respostas estáticas serializadas uma única vez no import
+_HEALTH_BYTES = orjson.dumps({
+    "status": "healthy",
+    "service": "SuvFin",
+    "version": "1.0.0",
+})
+_ROOT_BYTES = orjson.dumps({
+    "message": "SuvFin API — Finanças Pessoais pelo WhatsApp 💰",
+    "docs": "/docs",
+})
+
 
 @router.get("/health")
 async def health_check():
-    return {
-        "status": "healthy",
-        "service": "SuvFin",
-        "version": "1.0.0",
-    }
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 
 @router.get("/")
 async def root():
-    return {
-        "message": "SuvFin API — Finanças Pessoais pelo WhatsApp 💰",
-        "docs": "/docs",
-    }
+    return Response(content=_ROOT_BYTES, media_type="application/json")
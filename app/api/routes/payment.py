@@ -7,17 +7,26 @@ Endpoints:
   GET  /payment/status/{phone} — Consulta status de pagamento de um usuário
 """
 
-from datetime import datetime
-
-from fastapi import APIRouter, Request, Query, HTTPException
+import asyncio
+import hashlib
+from datetime import datetime, timezone
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping
+
+from fastapi import APIRouter, BackgroundTasks, Request, Query, HTTPException
 from loguru import logger
-from sqlalchemy import select
+from pydantic import ValidationError
+from sqlalchemy import bindparam, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, lazyload
 
 from app.config.database import async_session
 from app.config.settings import settings
 from app.models.user import User, LicenseType
 from app.models.payment import Payment, PaymentStatus
 from app.schemas.payment import (
+    AbacatePayWebhookEvent,
     CreateBillingRequest,
     CreateBillingResponse,
     PaymentStatusResponse,
@@ -26,6 +35,12 @@ from app.services.payment.abacatepay_service import AbacatePayService, AbacatePa
 from app.services.license.license_service import LicenseService
 from app.services.whatsapp.client import WhatsAppClient
 from app.services.admin.subscription_service import SubscriptionService
+from app.services.webhook.idempotency import (
+    release_webhook,
+    webhook_idempotent,
+    webhook_processed,
+)
+from app.services.webhook.lock import redis_lock
 
 router = APIRouter(prefix="/payment", tags=["payment"])
 
@@ -33,6 +48,100 @@ router = APIRouter(prefix="/payment", tags=["payment"])
 # O AbacatePay envia para /webhooks/abacatepay?webhookSecret=<secret>
 webhook_router = APIRouter(tags=["payment"])
 
+# Caracteres removidos na normalização de telefone (uma passada em C)
+_PHONE_STRIP = str.maketrans("", "", " -()/.+")
+_BR_COUNTRY_CODE = "55"
+
+# Janela de dedupe por hash do corpo (reentregas byte a byte idênticas)
+_BODY_DEDUPE_TTL = 600
+
+# Eventos processados ao mesmo tempo (rajadas de reenvio do AbacatePay):
+# o excedente espera aqui em vez de disputar o pool do banco
+_MAX_CONCURRENT_BILLING_EVENTS = 16
+_billing_semaphore = asyncio.Semaphore(_MAX_CONCURRENT_BILLING_EVENTS)
+
+# Status do AbacatePay → PaymentStatus local
+_BILLING_STATUS_MAP: Mapping[str, PaymentStatus] = MappingProxyType({
+    "PENDING": PaymentStatus.PENDING,
+    "PAID": PaymentStatus.PAID,
+    "ACTIVE": PaymentStatus.PAID,  # AbacatePay envia ACTIVE quando pago
+    "COMPLETED": PaymentStatus.PAID,
+    "EXPIRED": PaymentStatus.EXPIRED,
+    "CANCELLED": PaymentStatus.CANCELLED,
+    "REFUNDED": PaymentStatus.REFUNDED,
+})
+
+_VALID_PLANS = frozenset(("BASICO", "PRO", "PREMIUM"))
+_VALID_PERIODS = frozenset(("MONTHLY", "ANNUAL"))
+
+_PLAN_NAMES = {"BASICO": "Básico", "PRO": "Pro", "PREMIUM": "Premium"}
+
+_PAYMENT_CONFIRMED_TEMPLATE = (
+    "🎉 *Pagamento confirmado!*\n\n"
+    "Seu plano foi atualizado para *{plan}*! 🚀\n\n"
+    "Obrigado por escolher o SuvFin! 💚🥑"
+)
+
+# Statements montados uma única vez no import (parâmetros via bindparam)
+_PENDING_PAYMENT_STMT = (
+    select(Payment)
+    .where(
+        Payment.user_id == bindparam("user_id"),
+        Payment.status == PaymentStatus.PENDING,
+    )
+    .limit(1)
+)
+_PAYMENT_BY_BILLING_STMT = (
+    select(Payment)
+    # Usuário vem no mesmo SELECT (JOIN) — sem query extra para o telefone;
+    # lazyload("*") evita carregar transações/assinatura (lazy="selectin" no User)
+    .options(joinedload(Payment.user, innerjoin=True).lazyload("*"))
+    .where(Payment.abacatepay_billing_id == bindparam("billing_id"))
+    # Serializa entregas duplicadas do mesmo billing (retries do AbacatePay);
+    # o lock fica só na linha de payments, não na do usuário
+    .with_for_update(of=Payment)
+)
+# Cobrança já registrada como PENDING — evento "pending" repetido é no-op
+_PENDING_BY_BILLING_STMT = select(Payment.id).where(
+    Payment.abacatepay_billing_id == bindparam("billing_id"),
+    Payment.status == PaymentStatus.PENDING,
+)
+_USER_BY_PHONE_STMT = select(User).where(User.phone == bindparam("phone"))
+# Só as colunas do índice ix_payments_user_created_at (INCLUDE) — index-only scan
+_LAST_PAYMENT_STMT = (
+    select(
+        Payment.plan_type,
+        Payment.billing_period,
+        Payment.abacatepay_billing_id,
+        Payment.status,
+    )
+    .where(Payment.user_id == bindparam("user_id"))
+    .order_by(Payment.created_at.desc())
+    .limit(1)
+)
+
+
+# Serviços sem estado por request — uma instância por processo,
+# reaproveitando o pool HTTP compartilhado de cada cliente.
+@lru_cache()
+def _abacatepay() -> AbacatePayService:
+    return AbacatePayService()
+
+
+@lru_cache()
+def _license() -> LicenseService:
+    return LicenseService()
+
+
+@lru_cache()
+def _whatsapp() -> WhatsAppClient:
+    return WhatsAppClient()
+
+
+@lru_cache()
+def _subscriptions() -> SubscriptionService:
+    return SubscriptionService()
+
 
 @router.post("/create-link", response_model=CreateBillingResponse)
 async def create_payment_link(body: CreateBillingRequest):
@@ -45,21 +154,18 @@ async def create_payment_link(body: CreateBillingRequest):
     plan = body.plan.upper()
     period = body.period.upper()
 
-    if plan not in ("BASICO", "PRO", "PREMIUM"):
+    if plan not in _VALID_PLANS:
         raise HTTPException(status_code=400, detail="Plano inválido. Use: BASICO, PRO ou PREMIUM")
-    if period not in ("MONTHLY", "ANNUAL"):
+    if period not in _VALID_PERIODS:
         raise HTTPException(status_code=400, detail="Período inválido. Use: MONTHLY ou ANNUAL")
 
-    license_service = LicenseService()
-    user, _ = await license_service.get_or_create_user(body.phone, body.name)
+    user, _ = await _license().get_or_create_user(body.phone, body.name)
 
-    # Verificar se já existe cobrança pendente para o mesmo plano
     async with async_session() as session:
-        stmt = select(Payment).where(
-            Payment.user_id == user.id,
-            Payment.status == PaymentStatus.PENDING,
+        # Verificar se já existe cobrança pendente para o mesmo plano
+        result = await session.execute(
+            _PENDING_PAYMENT_STMT, {"user_id": user.id}
         )
-        result = await session.execute(stmt)
         existing_payment = result.scalar_one_or_none()
 
         if existing_payment and existing_payment.payment_url:
@@ -84,9 +190,10 @@ async def create_payment_link(body: CreateBillingRequest):
             "taxId": body.tax_id,
         }
 
-    # Criar cobrança no AbacatePay
+    # Criar cobrança no AbacatePay — fora de qualquer sessão, para não
+    # segurar conexão do pool durante I/O de rede
     try:
-        abacatepay = AbacatePayService()
+        abacatepay = _abacatepay()
         price_cents = abacatepay.get_plan_price(plan, period)
         billing = await abacatepay.create_plan_billing(
             user_id=str(user.id),
@@ -102,9 +209,9 @@ async def create_payment_link(body: CreateBillingRequest):
             detail="Erro ao gerar link de pagamento. Tente novamente.",
         )
 
-    # Salvar cobrança no banco local
-    async with async_session() as session:
-        payment = Payment(
+    # Salvar cobrança no banco local (commit automático ao sair do bloco)
+    async with async_session.begin() as session:
+        session.add(Payment(
             user_id=user.id,
             abacatepay_billing_id=billing.get("id", ""),
             abacatepay_customer_id=billing.get("customer", {}).get("id") if billing.get("customer") else None,
@@ -113,9 +220,7 @@ async def create_payment_link(body: CreateBillingRequest):
             billing_period=period,
             status=PaymentStatus.PENDING,
             payment_url=billing.get("url", ""),
-        )
-        session.add(payment)
-        await session.commit()
+        ))
 
     period_label = "mensal" if period == "MONTHLY" else "anual"
     logger.info(
@@ -137,6 +242,7 @@ async def create_payment_link(body: CreateBillingRequest):
 @webhook_router.post("/webhooks/abacatepay")
 async def abacatepay_webhook(
     request: Request,
+    background_tasks: BackgroundTasks,
     webhookSecret: str = Query(None, alias="webhookSecret"),
 ):
     """
@@ -146,37 +252,80 @@ async def abacatepay_webhook(
     e o payload com os dados da cobrança atualizada.
     """
     # 1. Verificar secret
-    abacatepay = AbacatePayService()
-    if not abacatepay.verify_webhook_secret(webhookSecret or ""):
+    if not _abacatepay().verify_webhook_secret(webhookSecret or ""):
         logger.warning(f"❌ Webhook AbacatePay com secret inválido: {webhookSecret}")
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    # 2. Parsear payload
+    # 2. Parsear payload — JSON decodificado e validado numa passada só no
+    # pydantic-core, sem montar o dict intermediário em Python
+    body = await request.body()
     try:
-        payload = await request.json()
-        logger.info(f"🥑 Webhook AbacatePay recebido: {payload}")
+        event = AbacatePayWebhookEvent.model_validate_json(body)
+    except ValidationError as e:
+        # JSON malformado → 400; JSON válido fora do formato esperado → 422
+        if any(err["type"] == "json_invalid" for err in e.errors()):
+            raise HTTPException(status_code=400, detail="Invalid JSON")
+        raise HTTPException(status_code=422, detail="Invalid payload")
+
+    # 3. Reentrega idêntica (mesmo corpo) — descarta sem processar. A chave só
+    # vale pela janela inteira depois do sucesso; falha libera o reenvio
+    body_hash = hashlib.sha256(body).hexdigest()
+    body_key = f"abacatepay:body:{body_hash}"
+    if not await webhook_idempotent(body_key):
+        logger.info(f"🔁 Webhook AbacatePay com corpo repetido ignorado ({body_hash[:12]})")
+        return {"status": "duplicate"}
+
+    logger.opt(lazy=True).info(
+        "🥑 Webhook AbacatePay recebido: {}", lambda: body.decode(errors="replace")
+    )
+
+    # 4. Processar dentro da requisição (sem fila durável): o 200 só sai depois
+    # do commit; falha vira 500 e o AbacatePay reenvia o evento. Assinatura e
+    # WhatsApp ficam para depois da resposta, fora do semáforo
+    processed = False
+    try:
+        async with _billing_semaphore:
+            result = await _process_billing_event(
+                event, background_tasks, request.headers.get("Idempotency-Key")
+            )
+        processed = True
     except Exception:
-        raise HTTPException(status_code=400, detail="Invalid JSON")
+        logger.opt(exception=True).error(
+            "❌ Falha ao processar evento AbacatePay (billing={})", _billing_id(event)
+        )
+        raise HTTPException(status_code=500, detail="Processing failed")
+    finally:
+        if processed:
+            await webhook_processed(body_key, ttl=_BODY_DEDUPE_TTL)
+        else:
+            await release_webhook(body_key)
+
+    return result
 
+
+async def _process_billing_event(
+    event: AbacatePayWebhookEvent,
+    background_tasks: BackgroundTasks,
+    idempotency_key: str | None = None,
+) -> dict:
+    """
+    Processa o evento de cobrança do AbacatePay (deduplicação + aplicação).
+    Retorna o corpo da resposta do webhook.
+    """
     # O payload contém os dados da cobrança (billing)
     # Estrutura: { "event": "billing.paid", "data": { "billing": { "id": "...", ... } } }
-    data = payload.get("data", {})
-    billing_data = data.get("billing", data) if isinstance(data, dict) else {}
-    billing_id = billing_data.get("id", "")
-    billing_status = billing_data.get("status", "")
+    data = event.data
+    billing_data = event.billing
 
-    # Fallback: tentar pegar do nível superior se não achou
-    if not billing_id:
-        billing_id = data.get("id", "") or payload.get("id", "")
-    if not billing_status:
-        billing_status = data.get("status", "") or payload.get("status", "")
+    billing_id = _billing_id(event)
+    billing_status = _first((billing_data, data), "status") or event.status or ""
 
     if not billing_id:
         logger.warning("Webhook sem billing ID")
         return {"status": "ignored"}
 
     # Usar o tipo de evento como sinal de pagamento confirmado
-    event_type = payload.get("event", "")
+    event_type = event.event or ""
     if event_type == "billing.paid" and billing_status not in ("PAID",):
         logger.info(
             f"🥑 Evento '{event_type}' com status '{billing_status}' — "
@@ -186,126 +335,163 @@ async def abacatepay_webhook(
 
     logger.info(f"🥑 Cobrança {billing_id} → status: {billing_status} (event: {event_type})")
 
-    # 3. Buscar pagamento local
-    async with async_session() as session:
-        stmt = select(Payment).where(
-            Payment.abacatepay_billing_id == billing_id
-        )
-        result = await session.execute(stmt)
-        payment = result.scalar_one_or_none()
-
-        if not payment:
-            # Pagamento não existe localmente — provavelmente criado direto no AbacatePay
-            # Tentar criar usuário e pagamento a partir dos dados do webhook
-            customer_data = billing_data.get("customer", {}) or data.get("customer", {}) or {}
-            metadata = customer_data.get("metadata", {}) or billing_data.get("metadata", {}) or {}
-
-            customer_phone = (
-                customer_data.get("cellphone", "")
-                or metadata.get("cellphone", "")
-                or metadata.get("phone", "")
-            )
-            customer_name = customer_data.get("name", "") or metadata.get("name", "")
-            customer_id = customer_data.get("id", "")
-            amount = billing_data.get("amount") or data.get("amount") or settings.PREMIUM_PRICE_CENTS
-
-            if not customer_phone:
-                logger.warning(
-                    f"Webhook sem billing local e sem telefone do cliente. "
-                    f"billing_id={billing_id}, payload={payload}"
-                )
-                return {"status": "not_found", "reason": "no_phone"}
+    # Reentrega do mesmo evento — descarta antes de tocar no banco
+    event_key = idempotency_key or f"{billing_id}:{billing_status}"
+    event_key = f"abacatepay:{event_key}"
+    if not await webhook_idempotent(event_key):
+        logger.info(f"🔁 Evento duplicado ignorado: billing={billing_id}, status={billing_status}")
+        return {"status": "duplicate", "billing_id": billing_id}
 
-            # Normalizar telefone
-            customer_phone = (
-                customer_phone.replace(" ", "").replace("-", "")
-                .replace("(", "").replace(")", "")
-            )
-            if not customer_phone.startswith("55") and len(customer_phone) <= 11:
-                customer_phone = f"55{customer_phone}"
-
-            logger.info(
-                f"🆕 Criando usuário/pagamento via webhook direto. "
-                f"phone={customer_phone}, name={customer_name}, billing={billing_id}"
-            )
-
-            # Criar ou buscar usuário
-            license_service = LicenseService()
-            user, _ = await license_service.get_or_create_user(
-                phone=customer_phone,
-                name=customer_name or "Usuário AbacatePay",
-            )
-
-            # Criar registro de pagamento
-            payment = Payment(
-                user_id=user.id,
-                abacatepay_billing_id=billing_id,
-                abacatepay_customer_id=customer_id or None,
-                amount_cents=int(amount) if amount else settings.PREMIUM_PRICE_CENTS,
-                status=PaymentStatus.PENDING,
-                payment_url="",
+    # Chave longa só depois do commit; falha (banco, upgrade, crash) libera o reenvio
+    processed = False
+    try:
+        result = await _apply_billing_event(
+            event, billing_id, billing_status, background_tasks
+        )
+        processed = True
+    finally:
+        if processed:
+            await webhook_processed(event_key)
+        else:
+            await release_webhook(event_key)
+    return result
+
+
+async def _apply_billing_event(
+    event: AbacatePayWebhookEvent,
+    billing_id: str,
+    billing_status: str,
+    background_tasks: BackgroundTasks,
+) -> dict:
+    """
+    Aplica o evento de cobrança no banco (pagamento, upgrade). Assinatura e
+    notificação do usuário são agendadas para depois da resposta.
+    """
+    data = event.data
+    billing_data = event.billing
+
+    # Eventos billing.created/pending sobre cobrança já PENDING não mudam nada —
+    # leitura leve (sem lock, sem escrita) antes da transação completa
+    if _map_billing_status(billing_status) == PaymentStatus.PENDING:
+        async with async_session() as session:
+            already_pending = await session.scalar(
+                _PENDING_BY_BILLING_STMT, {"billing_id": billing_id}
             )
-            session.add(payment)
-            await session.flush()
-
-            logger.info(f"✅ Pagamento criado via webhook: user={customer_phone}, billing={billing_id}")
-
-        # 4. Atualizar status do pagamento
-        old_status = payment.status
-        new_status = _map_billing_status(billing_status)
-        payment.status = new_status
-        payment.updated_at = datetime.utcnow()
-
-        if new_status == PaymentStatus.PAID and old_status != PaymentStatus.PAID:
-            payment.paid_at = datetime.utcnow()
-
-            # 5. Fazer upgrade do usuário para o plano pago
-            plan_type = payment.plan_type or "PRO"
-            billing_period = payment.billing_period or "MONTHLY"
-            license_service = LicenseService()
-            success = await license_service.upgrade_to_plan(
-                user_id=str(payment.user_id),
-                plan=plan_type,
-                period=billing_period,
+        if already_pending:
+            logger.debug(f"Cobrança {billing_id} já PENDING — nada a fazer")
+            return {"status": "processed", "billing_id": billing_id}
+
+    # Eventos simultâneos da mesma cobrança esperam no Redis, não no banco
+    async with redis_lock(f"lock:abacatepay:{billing_id}"):
+        # Buscar pagamento local — lock na linha até o fim da transação
+        async with async_session.begin() as session:
+            result = await session.execute(
+                _PAYMENT_BY_BILLING_STMT, {"billing_id": billing_id}
             )
+            payment = result.scalar_one_or_none()
+            # Usuário já carregado junto com o pagamento (joinedload)
+            user = payment.user if payment else None
+
+            if not payment:
+                # Pagamento não existe localmente — provavelmente criado direto no AbacatePay
+                # Tentar criar usuário e pagamento a partir dos dados do webhook
+                customer_data = _first((billing_data, data), "customer", default={})
+                metadata = _first((customer_data, billing_data), "metadata", default={})
+
+                # customer.cellphone → metadata.cellphone → metadata.phone
+                customer_phone = (
+                    _first((customer_data, metadata), "cellphone")
+                    or metadata.get("phone", "")
+                )
+                customer_name = _first((customer_data, metadata), "name")
+                customer_id = customer_data.get("id", "")
+                amount = _first((billing_data, data), "amount", default=settings.PREMIUM_PRICE_CENTS)
+
+                if not customer_phone:
+                    logger.warning(
+                        f"Webhook sem billing local e sem telefone do cliente. "
+                        f"billing_id={billing_id}, data={data}"
+                    )
+                    return {"status": "not_found", "reason": "no_phone"}
 
-            plan_names = {"BASICO": "Básico", "PRO": "Pro", "PREMIUM": "Premium"}
-            plan_display = plan_names.get(plan_type, plan_type)
+                # Normalizar telefone
+                customer_phone = customer_phone.translate(_PHONE_STRIP)
+                if not customer_phone.startswith(_BR_COUNTRY_CODE) and len(customer_phone) <= 11:
+                    customer_phone = _BR_COUNTRY_CODE + customer_phone
 
-            if success:
-                logger.info(f"🎉 Upgrade {plan_display} confirmado via pagamento {billing_id}")
+                logger.info(
+                    f"🆕 Criando usuário/pagamento via webhook direto. "
+                    f"phone={customer_phone}, name={customer_name}, billing={billing_id}"
+                )
 
-                # Sincronizar subscription na nova tabela de subscriptions
+                # Criar ou buscar usuário
+                user, _ = await _license().get_or_create_user(
+                    phone=customer_phone,
+                    name=customer_name or "Usuário AbacatePay",
+                )
+                # Trazer o usuário para esta sessão — o upgrade entra no mesmo commit
+                user = await session.get(User, user.id, options=[lazyload("*")])
+
+                # Criar registro de pagamento
+                payment = Payment(
+                    user_id=user.id,
+                    abacatepay_billing_id=billing_id,
+                    abacatepay_customer_id=customer_id or None,
+                    amount_cents=int(amount) if amount else settings.PREMIUM_PRICE_CENTS,
+                    status=PaymentStatus.PENDING,
+                    payment_url="",
+                )
                 try:
-                    sub_service = SubscriptionService()
-                    await sub_service.sync_from_payment(
-                        user_id=str(payment.user_id),
-                        plan_type=plan_type,
-                        billing_period=billing_period,
+                    async with session.begin_nested():
+                        session.add(payment)
+                except IntegrityError:
+                    # Outra entrega do mesmo billing inseriu primeiro — usar a linha vencedora
+                    logger.info(f"🔁 Pagamento {billing_id} criado por entrega concorrente")
+                    result = await session.execute(
+                        _PAYMENT_BY_BILLING_STMT, {"billing_id": billing_id}
                     )
-                except Exception as e:
-                    logger.error(f"Erro ao sincronizar subscription: {e}")
-
-                # 6. Notificar usuário via WhatsApp
-                user_stmt = select(User).where(User.id == payment.user_id)
-                user_result = await session.execute(user_stmt)
-                user = user_result.scalar_one_or_none()
-
-                if user:
-                    try:
-                        client = WhatsAppClient()
-                        await client.send_text(
-                            user.phone,
-                            f"🎉 *Pagamento confirmado!*\n\n"
-                            f"Seu plano foi atualizado para *{plan_display}*! 🚀\n\n"
-                            f"Obrigado por escolher o SuvFin! 💚🥑",
-                        )
-                    except Exception as e:
-                        logger.error(f"Erro ao notificar usuário: {e}")
-            else:
-                logger.error(f"Falha ao fazer upgrade para billing: {billing_id}")
-
-        await session.commit()
+                    payment = result.scalar_one()
+                    user = payment.user
+                else:
+                    logger.info(f"✅ Pagamento criado via webhook: user={customer_phone}, billing={billing_id}")
+
+            # Atualizar status do pagamento
+            subscription_sync = None
+            old_status = payment.status
+            new_status = _map_billing_status(billing_status)
+            # Colunas são timestamp sem fuso (UTC naive) — um único relógio por evento
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            payment.status = new_status
+            payment.updated_at = now
+
+            # old_status lido com o lock: só uma entrega concorrente entra no upgrade
+            if new_status == PaymentStatus.PAID and old_status != PaymentStatus.PAID:
+                payment.paid_at = now
+
+                # Fazer upgrade do usuário para o plano pago
+                plan_type = payment.plan_type or "PRO"
+                billing_period = payment.billing_period or "MONTHLY"
+                # Usuário já está nesta sessão (JOIN com o pagamento) — sem novo SELECT;
+                # upgrade e status do pagamento entram no mesmo commit
+                _license().apply_plan(user, plan=plan_type, period=billing_period)
+
+                plan_display = _PLAN_NAMES.get(plan_type, plan_type)
+                logger.info(f"🎉 Upgrade {plan_display} confirmado via pagamento {billing_id}")
+
+                # Subscription e WhatsApp só depois do commit
+                subscription_sync = {
+                    "user_id": str(payment.user_id),
+                    "plan_type": plan_type,
+                    "billing_period": billing_period,
+                }
+                notify_phone = user.phone
+
+    # Upgrade commitado: sincronização e envio ao WhatsApp rodam depois da
+    # resposta ao AbacatePay — não atrasam o ack nem ocupam o semáforo
+    if subscription_sync:
+        background_tasks.add_task(
+            _after_upgrade, subscription_sync, notify_phone, plan_display
+        )
 
     return {"status": "processed", "billing_id": billing_id}
 
@@ -314,22 +500,17 @@ async def abacatepay_webhook(
 async def get_payment_status(phone: str):
     """Consulta o status de pagamento/licença de um usuário pelo telefone."""
     async with async_session() as session:
-        user_stmt = select(User).where(User.phone == phone)
-        user_result = await session.execute(user_stmt)
+        user_result = await session.execute(_USER_BY_PHONE_STMT, {"phone": phone})
         user = user_result.scalar_one_or_none()
 
         if not user:
             raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
         # Buscar último pagamento
-        payment_stmt = (
-            select(Payment)
-            .where(Payment.user_id == user.id)
-            .order_by(Payment.created_at.desc())
-            .limit(1)
+        payment_result = await session.execute(
+            _LAST_PAYMENT_STMT, {"user_id": user.id}
         )
-        payment_result = await session.execute(payment_stmt)
-        last_payment = payment_result.scalar_one_or_none()
+        last_payment = payment_result.one_or_none()
 
         return PaymentStatusResponse(
             user_phone=user.phone,
@@ -342,15 +523,48 @@ async def get_payment_status(phone: str):
         )
 
 
+def _billing_id(event: AbacatePayWebhookEvent) -> str:
+    """ID da cobrança: data.billing, data ou (fallback) o nível superior."""
+    return _first((event.billing, event.data), "id") or event.id or ""
+
+
+def _first(dicts: tuple[dict, ...], *keys: str, default=""):
+    """
+    Retorna o primeiro valor não vazio encontrado, em ordem de prioridade:
+    cada chave de `keys` é procurada em todos os dicts antes da próxima.
+    """
+    for key in keys:
+        for d in dicts:
+            value = d.get(key)
+            if value:
+                return value
+    return default
+
+
+async def _after_upgrade(
+    subscription_sync: dict, phone: str, plan_display: str
+) -> None:
+    """
+    Pós-commit do upgrade: sincroniza a assinatura e notifica o usuário.
+    A sincronização abre sessão própria, e a assinatura só fica ativa se o
+    upgrade do usuário foi de fato commitado.
+    """
+    try:
+        await _subscriptions().sync_from_payment(**subscription_sync)
+    except Exception as e:
+        logger.error(f"Erro ao sincronizar subscription: {e}")
+
+    await _notify_upgrade(phone, plan_display)
+
+
+async def _notify_upgrade(phone: str, plan_display: str) -> None:
+    """Notifica o usuário via WhatsApp que o pagamento foi confirmado."""
+    try:
+        await _whatsapp().send_text(phone, _PAYMENT_CONFIRMED_TEMPLATE.format(plan=plan_display))
+    except Exception as e:
+        logger.error(f"Erro ao notificar usuário: {e}")
+
+
 def _map_billing_status(status: str) -> PaymentStatus:
     """Mapeia o status do AbacatePay para o PaymentStatus local."""
-    mapping = {
-        "PENDING": PaymentStatus.PENDING,
-        "PAID": PaymentStatus.PAID,
-        "ACTIVE": PaymentStatus.PAID,  # AbacatePay envia ACTIVE quando pago
-        "COMPLETED": PaymentStatus.PAID,
-        "EXPIRED": PaymentStatus.EXPIRED,
-        "CANCELLED": PaymentStatus.CANCELLED,
-        "REFUNDED": PaymentStatus.REFUNDED,
-    }
-    return mapping.get(status, PaymentStatus.PENDING)
+    return _BILLING_STATUS_MAP.get(status.upper(), PaymentStatus.PENDING)
@@ -3,6 +3,8 @@ Rota de Webhook do Pluggy Open Finance.
 Recebe notificações de eventos (item/*, transactions/*).
 """
 
+from functools import lru_cache
+
 from fastapi import APIRouter, Request, BackgroundTasks, HTTPException
 from loguru import logger
 
@@ -15,6 +17,17 @@ from sqlalchemy import select
 router = APIRouter(prefix="/api/v1/pluggy", tags=["pluggy-webhook"])
 
 
+# Serviços sem estado por evento — uma instância por processo
+@lru_cache()
+def _sync_service() -> PluggySyncService:
+    return PluggySyncService()
+
+
+@lru_cache()
+def _whatsapp() -> WhatsAppClient:
+    return WhatsAppClient()
+
+
 @router.post("/webhook")
 async def pluggy_webhook(request: Request, background_tasks: BackgroundTasks):
     """
@@ -40,7 +53,7 @@ async def _process_pluggy_event(payload: dict) -> None:
     """Processa evento do Pluggy em background."""
     event = payload.get("event", "")
     item_id = payload.get("itemId", "")
-    sync_service = PluggySyncService()
+    sync_service = _sync_service()
 
     try:
         if event in ("item/created", "item/updated"):
@@ -109,8 +122,7 @@ async def _notify_item_error(pluggy_item_id: str, status: str) -> None:
             f"Envie \"conectar banco\" para gerar um novo link."
         )
 
-        client = WhatsAppClient()
-        await client.send_text(to=user.phone, text=message)
+        await _whatsapp().send_text(to=user.phone, text=message)
         logger.info(f"📲 Notificação de erro enviada para {user.phone}")
 
     except Exception as e:
@@ -20,14 +20,11 @@ async def get_today_usage():
 @router.get("/tokens/summary")
 async def get_usage_summary(days: int = Query(default=7, le=30)):
     """Retorna resumo de uso dos últimos N dias."""
-    results = []
-    total_cost = 0.0
+    dates = _last_dates(days)
+    hashes = await _hgetall_many([f"tokens:global:{d}" for d in dates])
 
-    for i in range(days):
-        d = (date.today() - timedelta(days=i)).isoformat()
-        usage = await _get_usage_for_date(d)
-        results.append(usage)
-        total_cost += usage.get("estimated_cost_usd", 0)
+    results = [_usage_from_hash(d, data) for d, data in zip(dates, hashes)]
+    total_cost = sum(usage["estimated_cost_usd"] for usage in results)
 
     return {
         "period_days": days,
@@ -48,31 +45,26 @@ async def get_usage_summary(days: int = Query(default=7, le=30)):
 @router.get("/tokens/user/{phone}")
 async def get_user_usage(phone: str, days: int = Query(default=7, le=30)):
     """Retorna uso de tokens de um usuário específico."""
-    results = []
+    dates = _last_dates(days)
+    hashes = await _hgetall_many([f"tokens:user:{phone}:{d}" for d in dates])
 
-    for i in range(days):
-        d = (date.today() - timedelta(days=i)).isoformat()
-        key = f"tokens:user:{phone}:{d}"
-
-        try:
-            data = await redis_client.hgetall(key)
-            if data:
-                input_t = int(data.get("input", 0))
-                output_t = int(data.get("output", 0))
-                results.append({
-                    "date": d,
-                    "input_tokens": input_t,
-                    "output_tokens": output_t,
-                    "cache_read_tokens": int(data.get("cache_read", 0)),
-                    "requests": int(data.get("requests", 0)),
-                    "estimated_cost_usd": round(
-                        (input_t / 1_000_000) * 3.00
-                        + (output_t / 1_000_000) * 15.00,
-                        4,
-                    ),
-                })
-        except Exception:
-            pass
+    results = []
+    for d, data in zip(dates, hashes):
+        if data:
+            input_t = int(data.get("input", 0))
+            output_t = int(data.get("output", 0))
+            results.append({
+                "date": d,
+                "input_tokens": input_t,
+                "output_tokens": output_t,
+                "cache_read_tokens": int(data.get("cache_read", 0)),
+                "requests": int(data.get("requests", 0)),
+                "estimated_cost_usd": round(
+                    (input_t / 1_000_000) * 3.00
+                    + (output_t / 1_000_000) * 15.00,
+                    4,
+                ),
+            })
 
     return {
         "phone": phone,
@@ -84,15 +76,35 @@ async def get_user_usage(phone: str, days: int = Query(default=7, le=30)):
     }
 
 
+def _last_dates(days: int) -> list[str]:
+    """Datas ISO dos últimos N dias, de hoje para trás."""
+    today = date.today()
+    return [(today - timedelta(days=i)).isoformat() for i in range(days)]
+
+
+async def _hgetall_many(keys: list[str]) -> list[dict]:
+    """HGETALL de várias chaves em um único round-trip (pipeline)."""
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hgetall(key)
+            return await pipe.execute()
+    except Exception:
+        return [{} for _ in keys]
+
+
 async def _get_usage_for_date(d: str) -> dict:
     """Retorna métricas de uso para uma data."""
-    key = f"tokens:global:{d}"
-
     try:
-        data = await redis_client.hgetall(key)
+        data = await redis_client.hgetall(f"tokens:global:{d}")
     except Exception:
         data = {}
 
+    return _usage_from_hash(d, data)
+
+
+def _usage_from_hash(d: str, data: dict) -> dict:
+    """Calcula as métricas de uso a partir do hash global de uma data."""
     input_t = int(data.get("input", 0))
     output_t = int(data.get("output", 0))
     cache_read = int(data.get("cache_read", 0))
@@ -3,20 +3,248 @@ Rotas do Webhook do WhatsApp (Meta Cloud API).
 """
 
 import asyncio
+import hmac
 import re
+from functools import lru_cache
+from typing import Awaitable, Callable
 
-from fastapi import APIRouter, Request, Response, Query, HTTPException, BackgroundTasks
+import orjson
+from fastapi import APIRouter, Depends, Request, Response, Query, HTTPException
 from loguru import logger
 
+from app.api.middleware.rate_limit import rate_limit
+from app.api.middleware.signature import verify_webhook_signature
 from app.config.settings import settings
+from app.models.user import PAID_LICENSE_TYPES
+from app.schemas.webhook import ParsedMessage
 from app.services.whatsapp.parser import WhatsAppParser
 from app.services.whatsapp.client import WhatsAppClient
 from app.services.license.license_service import LicenseService
 from app.services.mcp.processor import MCPProcessor
 from app.services.admin.message_service import MessageService
+from app.services.webhook.idempotency import (
+    release_webhook,
+    webhook_idempotent,
+    webhook_processed,
+)
 
 router = APIRouter(tags=["webhook"])
 
+# Token do handshake da Meta, fixo durante a execução (bytes para compare_digest)
+_VERIFY_TOKEN = settings.WEBHOOK_VERIFY_TOKEN.encode()
+
+# Corpo do ack serializado uma única vez no import (mesmo padrão do health)
+_ACK_BYTES = orjson.dumps({"status": "received"})
+
+# Mensagens montadas uma única vez no import; só os campos variáveis via .format()
+_WELCOME_TEMPLATE = (
+    "Olá, {display_name}! 👋\n\n"
+    "🌟 *Bem-vindo(a) ao SuvFin!*\n\n"
+    "Sou seu assistente de finanças pessoais pelo WhatsApp. "
+    "Vou te ajudar a organizar sua vida financeira de forma simples e rápida!\n\n"
+    "🆓 Você ganhou um *período de teste grátis* até *{expires_str}*!\n\n"
+    "O que posso fazer por você:\n"
+    "📝 Registrar gastos e receitas\n"
+    "📊 Gerar relatórios por período e categoria\n"
+    "💰 Mostrar seu saldo atual\n"
+    "📸 Analisar comprovantes por foto\n"
+    "🗑️ Remover e editar lançamentos\n\n"
+    "Experimente agora! Envie algo como:\n"
+    '  _"Gastei 50 reais no almoço"_\n'
+    '  _"Qual meu saldo?"_\n'
+    '  _"Recebi 3000 de salário"_\n\n'
+    "Vamos começar? 🚀"
+)
+
+_PLAN_LINK_TEMPLATE = (
+    "✨ *{plan_label} — {period_label}*\n\n"
+    "💰 *{price_label}*\n\n"
+    "{features}\n\n"
+    "🔗 Assine agora pelo link:\n{payment_url}\n\n"
+    "✅ Após o pagamento, seu plano é ativado automaticamente!"
+)
+
+# Partes do ID de plano (plan_{tipo}_{periodo}) aceitas na seleção
+_PLAN_MAP = {"basico": "BASICO", "pro": "PRO", "premium": "PREMIUM"}
+_PERIOD_MAP = {"monthly": "MONTHLY", "annual": "ANNUAL"}
+
+# Oferta exibida no link de pagamento, por período (só o Pro é vendido hoje)
+_PERIOD_LABELS = {"MONTHLY": "Mensal", "ANNUAL": "Anual"}
+_PLAN_TITLES = {"MONTHLY": "🟢 Plano Mensal", "ANNUAL": "🏆 Plano Anual"}
+_PLAN_PRICES = {"MONTHLY": "R$ 19,90/mês", "ANNUAL": "R$ 190/ano"}
+_PLAN_FEATURES = {
+    "MONTHLY": (
+        "✅ Tudo do período gratuito\n"
+        "✅ Registros ilimitados\n"
+        "✅ Relatórios avançados\n"
+        "✅ Suporte prioritário\n"
+        "✅ Cancele quando quiser"
+    ),
+    "ANNUAL": (
+        "✅ Tudo do plano mensal\n"
+        "✅ Economia de R$ 48,80/ano\n"
+        "✅ Suporte VIP\n"
+        "✅ Novos recursos primeiro\n"
+        "✅ 2 meses grátis"
+    ),
+}
+
+# Todos os IDs válidos (plan_{tipo}_{periodo}) → (plan, period): parse em um lookup
+_PLAN_ID_MAP = {
+    f"plan_{plan_key}_{period_key}": (plan, period)
+    for plan_key, plan in _PLAN_MAP.items()
+    for period_key, period in _PERIOD_MAP.items()
+}
+
+# Mensagem de cada (plan, period) pré-montada; só o link entra por .format()
+_PLAN_MSG_TEMPLATE = {
+    (plan, period): _PLAN_LINK_TEMPLATE.format(
+        plan_label=_PLAN_TITLES[period],
+        period_label=_PERIOD_LABELS[period],
+        price_label=_PLAN_PRICES[period],
+        features=_PLAN_FEATURES[period],
+        payment_url="{payment_url}",
+    )
+    for plan, period in _PLAN_ID_MAP.values()
+}
+
+# Lista interativa de planos — igual para todos os envios
+_PLAN_SECTIONS = [
+    {
+        "title": "Planos Disponíveis",
+        "rows": [
+            {
+                "id": "plan_pro_monthly",
+                "title": "🟢 Plano Mensal",
+                "description": "R$ 19,90/mês • Registros ilimitados",
+            },
+            {
+                "id": "plan_pro_annual",
+                "title": "🏆 Plano Anual",
+                "description": "R$ 190/ano • Economize 20%",
+            },
+        ],
+    },
+]
+
+_PLAN_LABELS = {
+    "FREE_TRIAL": "Teste Grátis",
+    "BASICO": "⭐ Básico",
+    "PRO": "⚡ Pro",
+    "PREMIUM": "👑 Premium",
+}
+
+_PLAN_LIST_FOOTER = "SuvFin — Seu financeiro no WhatsApp"
+_PLAN_LIST_BUTTON = "Ver Planos"
+
+_TRIAL_EXPIRED_BODY_MSG = (
+    "⏰ Seu período de teste expirou!\n\n"
+    "Para continuar usando o SuvFin, escolha um plano abaixo.\n\n"
+    "💡 O plano anual tem 20% de desconto!"
+)
+
+_TRIAL_EXPIRED_FALLBACK_MSG = (
+    "⏰ *Seu período de teste expirou!*\n\n"
+    "Escolha um plano para continuar:\n\n"
+    "🟢 *Plano Mensal* — R$ 19,90/mês\n"
+    "🏆 *Plano Anual* — R$ 190/ano _(economize 20%!)_\n\n"
+    'Envie: _"Quero o Mensal"_ ou _"Quero o Anual"_'
+)
+
+_ACTIVE_PLAN_BODY_TEMPLATE = (
+    "Seu plano atual: *{current_label}*\n\n"
+    "Confira os planos disponíveis:\n\n"
+    "💡 O plano anual tem 20% de desconto!"
+)
+
+_ACTIVE_PLAN_FALLBACK_TEMPLATE = (
+    "📋 *Planos SuvFin* (seu plano atual: {current_label})\n\n"
+    "🟢 *Plano Mensal* — R$ 19,90/mês (registros ilimitados)\n"
+    "🏆 *Plano Anual* — R$ 190/ano _(economize 20%!)_\n\n"
+    'Envie: _"Quero o Mensal"_ ou _"Quero o Anual"_'
+)
+
+_INVALID_OPTION_MSG = "❌ Opção inválida. Tente novamente."
+_PAYMENT_LINK_ERROR_MSG = (
+    "❌ Erro ao gerar o link de pagamento. Tente novamente em alguns instantes."
+)
+
+
+# Normalização de acentos do português (uma passada em C)
+_ACCENT_TABLE = str.maketrans("áàâãéêíóôõúç", "aaaaeeiooouc")
+
+# Padrões de detecção de plano, compilados uma única vez no import
+_PLAN_ANNUAL_RE = re.compile(r"\banual\b|\banuais\b|\bannual\b")
+# Evitar falsos positivos com palavras comuns do português:
+# "mês" (normalizado para "mes") e "pro" (= "para o") são muito comuns.
+# Só ativar quando há intenção clara de assinar/pagar.
+_PLAN_MONTHLY_RE = re.compile(
+    r"\bplano\s+mensal\b|\bmensal\b|\bassinar\b|\bquero\s+(?:o\s+)?mensal\b|\bquero\s+(?:o\s+)?plano\b"
+)
+# Todo match das duas regex acima contém um destes trechos
+_PLAN_SELECTION_KEYWORDS = ("anua", "annual", "mensal", "assinar", "plano")
+# Uma única regex, com prefixos fatorados. As variantes de várias palavras
+# ("ver os planos", "mudar plano", "quero fazer upgrade", "opcoes de plano"...)
+# sempre contêm "plano(s)" ou "upgrade" como palavra inteira, então já são
+# cobertas pelas alternativas simples — o resultado é o mesmo da lista antiga.
+_PLAN_INQUIRY_RE = re.compile(
+    r"\b(?:planos?|upgrade|assina(?:tura|r))\b|\bquanto\s+custa\b"
+)
+# Todo match da regex acima contém um destes trechos — filtro por substring
+# (busca em C) antes de rodar a regex
+_PLAN_INQUIRY_KEYWORDS = ("plano", "upgrade", "assina", "custa")
+
+
+# Tasks de processamento em andamento — referência forte até terminarem
+# (o event loop só guarda referência fraca; sem isso a task pode ser coletada)
+_pending_tasks: set[asyncio.Task] = set()
+
+# Limite de mensagens processadas ao mesmo tempo (rajadas/reenvios da Meta):
+# o excedente espera aqui em vez de disputar o pool do banco e os clientes HTTP
+_MAX_CONCURRENT_PROCESSING = 64
+_processing_semaphore = asyncio.Semaphore(_MAX_CONCURRENT_PROCESSING)
+
+
+def _on_task_done(task: asyncio.Task) -> None:
+    """Libera a referência e registra exceções (senão ficariam silenciosas)."""
+    _pending_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.opt(exception=task.exception()).error("Erro ao processar webhook")
+
+
+# Serviços sem estado por requisição — uma instância por processo
+# (o MCPProcessor mantém o pool HTTP do cliente Anthropic entre mensagens)
+@lru_cache()
+def _parser() -> WhatsAppParser:
+    return WhatsAppParser()
+
+
+@lru_cache()
+def _whatsapp() -> WhatsAppClient:
+    return WhatsAppClient()
+
+
+@lru_cache()
+def _license() -> LicenseService:
+    return LicenseService()
+
+
+@lru_cache()
+def _messages() -> MessageService:
+    return MessageService()
+
+
+@lru_cache()
+def _processor() -> MCPProcessor:
+    return MCPProcessor()
+
+
+async def close_webhook_services() -> None:
+    """Fecha o cliente Anthropic do MCPProcessor compartilhado (shutdown do app)."""
+    if _processor.cache_info().currsize:
+        await _processor().client.close()
+        _processor.cache_clear()
+
 
 @router.get("/webhook")
 async def verify_webhook(
@@ -28,11 +256,13 @@ async def verify_webhook(
     Verificação do webhook da Meta (handshake).
     A Meta envia GET com hub.mode, hub.challenge e hub.verify_token.
     """
-    logger.info(
-        f"Webhook verification: mode={hub_mode}, token={hub_verify_token}"
-    )
+    logger.info(f"Webhook verification: mode={hub_mode}")
 
-    if hub_mode == "subscribe" and hub_verify_token == settings.WEBHOOK_VERIFY_TOKEN:
+    if (
+        hub_mode == "subscribe"
+        and hub_verify_token
+        and hmac.compare_digest(hub_verify_token.encode(), _VERIFY_TOKEN)
+    ):
         logger.info("Webhook verificado com sucesso ✅")
         return Response(content=hub_challenge, media_type="text/plain")
 
@@ -40,75 +270,77 @@ async def verify_webhook(
     raise HTTPException(status_code=403, detail="Verification failed")
 
 
-@router.post("/webhook")
-async def handle_webhook(request: Request, background_tasks: BackgroundTasks):
+@router.post(
+    "/webhook",
+    dependencies=[Depends(verify_webhook_signature), Depends(rate_limit)],
+)
+async def handle_webhook(request: Request):
     """
     Recebe mensagens do WhatsApp Cloud API.
     Responde 200 imediatamente e processa em background.
     """
     try:
-        payload = await request.json()
-    except Exception:
+        payload = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON")
 
-    # A Meta espera 200 rápido — processa em background
-    background_tasks.add_task(_process_webhook, payload)
+    # A Meta espera 200 rápido — processa em task própria, já iniciada
+    task = asyncio.create_task(_bounded_process_webhook(payload))
+    _pending_tasks.add(task)
+    task.add_done_callback(_on_task_done)
+
+    return Response(content=_ACK_BYTES, media_type="application/json")
+
+
+def _truncate(content, limit: int = 50):
+    """Prévia do conteúdo para log (só strings são cortadas)."""
+    return content[:limit] if isinstance(content, str) else content
 
-    return {"status": "received"}
 
+def _is_paid(user) -> bool:
+    return user.license_type in PAID_LICENSE_TYPES
 
-def _detect_plan_selection(text: str) -> tuple[str, str] | None:
+
+def _might_be_plan_text(text: str) -> bool:
+    """
+    Rejeição rápida antes das regex: textos curtos ou sem letra ASCII nos
+    primeiros 64 caracteres (valores, emojis) não são mensagens sobre planos.
+    """
+    return len(text) >= 3 and any("a" <= c <= "z" for c in text[:64].lower())
+
+
+def _normalize(text: str) -> str:
+    """Minúsculas, sem espaços nas pontas e sem acentos — entrada das regex de plano."""
+    t = text.strip().lower()
+    # Texto só ASCII (a maioria dos comandos) não tem acento a remover
+    return t if t.isascii() else t.translate(_ACCENT_TABLE)
+
+
+def _detect_plan_selection(t: str) -> tuple[str, str] | None:
     """
     Detecta se o usuário está escolhendo um plano pelo texto da mensagem.
-    Retorna (plan, period) ou None.
+    Recebe o texto já passado por _normalize. Retorna (plan, period) ou None.
     """
-    t = text.lower().strip()
-    # Normalizar acentos comuns
-    t = t.replace("á", "a").replace("é", "e").replace("í", "i")
+    if not any(k in t for k in _PLAN_SELECTION_KEYWORDS):
+        return None
 
     # Detectar período (agora só temos Mensal e Anual)
-    if re.search(r"\banual\b|\banuais\b|\bannual\b", t):
+    if _PLAN_ANNUAL_RE.search(t):
         return ("PRO", "ANNUAL")
-    # Evitar falsos positivos com palavras comuns do português:
-    # "mês" (normalizado para "mes") e "pro" (= "para o") são muito comuns.
-    # Só ativar quando há intenção clara de assinar/pagar.
-    elif re.search(r"\bplano\s+mensal\b|\bmensal\b|\bassinar\b|\bquero\s+(o\s+)?mensal\b|\bquero\s+(o\s+)?plano\b", t):
+    elif _PLAN_MONTHLY_RE.search(t):
         return ("PRO", "MONTHLY")
 
     return None
 
 
-def _is_plan_inquiry(text: str) -> bool:
+def _is_plan_inquiry(t: str) -> bool:
     """
     Detecta se o usuário está perguntando sobre planos/upgrade/assinatura.
-    Retorna True se a mensagem é sobre planos.
+    Recebe o texto já passado por _normalize. Retorna True se é sobre planos.
     """
-    t = text.lower().strip()
-    t = t.replace("á", "a").replace("é", "e").replace("í", "i")
-    t = t.replace("ã", "a").replace("ç", "c").replace("ú", "u").replace("ó", "o")
-
-    plan_patterns = [
-        r"\bplanos?\b",
-        r"\bupgrade\b",
-        r"\bassinatura\b",
-        r"\bassinar\b",
-        r"\bquanto\s+custa\b",
-        r"\bmudar\s+plano\b",
-        r"\btrocar\s+plano\b",
-        r"\bmelhorar\s+plano\b",
-        r"\bquero\s+(fazer\s+)?upgrade\b",
-        r"\bver\s+(os\s+)?planos?\b",
-        r"\bsaber\s+(os\s+)?planos?\b",
-        r"\bconhecer\s+(os\s+)?planos?\b",
-        r"\bquais\s+(sao\s+)?(os\s+)?planos?\b",
-        r"\bopcoes\s+de\s+plano\b",
-        r"\bplanos\s+disponiveis\b",
-    ]
-
-    for pattern in plan_patterns:
-        if re.search(pattern, t):
-            return True
-    return False
+    if not any(k in t for k in _PLAN_INQUIRY_KEYWORDS):
+        return False
+    return _PLAN_INQUIRY_RE.search(t) is not None
 
 
 async def _send_plan_list(phone: str, client: WhatsAppClient) -> None:
@@ -117,266 +349,228 @@ async def _send_plan_list(phone: str, client: WhatsAppClient) -> None:
         await client.send_interactive_list(
             to=phone,
             header_text="Escolha seu Plano",
-            body_text=(
-                "⏰ Seu período de teste expirou!\n\n"
-                "Para continuar usando o SuvFin, escolha um plano abaixo.\n\n"
-                "💡 O plano anual tem 20% de desconto!"
-            ),
-            footer_text="SuvFin — Seu financeiro no WhatsApp",
-            button_text="Ver Planos",
-            sections=[
-                {
-                    "title": "Planos Disponíveis",
-                    "rows": [
-                        {
-                            "id": "plan_pro_monthly",
-                            "title": "🟢 Plano Mensal",
-                            "description": "R$ 19,90/mês • Registros ilimitados",
-                        },
-                        {
-                            "id": "plan_pro_annual",
-                            "title": "🏆 Plano Anual",
-                            "description": "R$ 190/ano • Economize 20%",
-                        },
-                    ],
-                },
-            ],
+            body_text=_TRIAL_EXPIRED_BODY_MSG,
+            footer_text=_PLAN_LIST_FOOTER,
+            button_text=_PLAN_LIST_BUTTON,
+            sections=_PLAN_SECTIONS,
         )
-        logger.info(f"📋 Lista de planos enviada para {phone}")
+        logger.info("📋 Lista de planos enviada para {}", phone)
     except Exception as e:
         logger.error(f"Erro ao enviar lista interativa para {phone}: {e}")
         # Fallback: texto simples
-        await client.send_text(
-            phone,
-            (
-                "⏰ *Seu período de teste expirou!*\n\n"
-                "Escolha um plano para continuar:\n\n"
-                "🟢 *Plano Mensal* — R$ 19,90/mês\n"
-                "🏆 *Plano Anual* — R$ 190/ano _(economize 20%!)_\n\n"
-                'Envie: _"Quero o Mensal"_ ou _"Quero o Anual"_'
-            ),
-        )
+        await client.send_text(phone, _TRIAL_EXPIRED_FALLBACK_MSG)
 
 
 async def _send_plan_list_active_user(phone: str, user, client: WhatsAppClient) -> None:
     """Envia lista de planos para usuário ativo que quer ver opções/upgrade."""
     current_plan = user.license_type.value if user.license_type else "FREE_TRIAL"
-    plan_labels = {
-        "FREE_TRIAL": "Teste Grátis",
-        "BASICO": "⭐ Básico",
-        "PRO": "⚡ Pro",
-        "PREMIUM": "👑 Premium",
-    }
-    current_label = plan_labels.get(current_plan, current_plan)
+    current_label = _PLAN_LABELS.get(current_plan, current_plan)
 
     try:
         await client.send_interactive_list(
             to=phone,
             header_text="Nossos Planos",
-            body_text=(
-                f"Seu plano atual: *{current_label}*\n\n"
-                "Confira os planos disponíveis:\n\n"
-                "💡 O plano anual tem 20% de desconto!"
-            ),
-            footer_text="SuvFin — Seu financeiro no WhatsApp",
-            button_text="Ver Planos",
-            sections=[
-                {
-                    "title": "Planos Disponíveis",
-                    "rows": [
-                        {
-                            "id": "plan_pro_monthly",
-                            "title": "🟢 Plano Mensal",
-                            "description": "R$ 19,90/mês • Registros ilimitados",
-                        },
-                        {
-                            "id": "plan_pro_annual",
-                            "title": "🏆 Plano Anual",
-                            "description": "R$ 190/ano • Economize 20%",
-                        },
-                    ],
-                },
-            ],
+            body_text=_ACTIVE_PLAN_BODY_TEMPLATE.format(current_label=current_label),
+            footer_text=_PLAN_LIST_FOOTER,
+            button_text=_PLAN_LIST_BUTTON,
+            sections=_PLAN_SECTIONS,
         )
-        logger.info(f"📋 Lista de planos enviada para usuário ativo {phone}")
+        logger.info("📋 Lista de planos enviada para usuário ativo {}", phone)
     except Exception as e:
         logger.error(f"Erro ao enviar lista interativa para {phone}: {e}")
         # Fallback: texto simples
         await client.send_text(
-            phone,
-            (
-                f"📋 *Planos SuvFin* (seu plano atual: {current_label})\n\n"
-                "🟢 *Plano Mensal* — R$ 19,90/mês (registros ilimitados)\n"
-                "🏆 *Plano Anual* — R$ 190/ano _(economize 20%!)_\n\n"
-                'Envie: _"Quero o Mensal"_ ou _"Quero o Anual"_'
-            ),
+            phone, _ACTIVE_PLAN_FALLBACK_TEMPLATE.format(current_label=current_label)
         )
 
 
 async def _handle_plan_selection(phone: str, plan_id: str, client: WhatsAppClient) -> None:
     """Processa seleção de plano (via lista interativa ou texto) e gera link de pagamento."""
     # Formato do ID: plan_{tipo}_{periodo}
-    parts = plan_id.replace("plan_", "").rsplit("_", 1)
-    if len(parts) != 2:
-        await client.send_text(phone, "❌ Opção inválida. Tente novamente.")
+    selection = _PLAN_ID_MAP.get(plan_id)
+    if not selection:
+        await client.send_text(phone, _INVALID_OPTION_MSG)
         return
 
-    plan_key, period_key = parts
-    plan_map = {"basico": "BASICO", "pro": "PRO", "premium": "PREMIUM"}
-    period_map = {"monthly": "MONTHLY", "annual": "ANNUAL"}
+    plan, period = selection
 
-    plan = plan_map.get(plan_key)
-    period = period_map.get(period_key)
+    try:
+        payment_url = await _license().get_payment_link(phone, plan=plan, period=period)
 
-    if not plan or not period:
-        await client.send_text(phone, "❌ Opção inválida. Tente novamente.")
-        return
+        plan_msg = _PLAN_MSG_TEMPLATE[selection].format(payment_url=payment_url)
+        await client.send_text(phone, plan_msg)
+        logger.info("💳 Link gerado para {}: {}", phone, _PERIOD_LABELS[period])
+    except Exception as e:
+        logger.error(f"Erro ao gerar link para plano {plan}: {e}")
+        await client.send_text(phone, _PAYMENT_LINK_ERROR_MSG)
 
-    period_label = "Mensal" if period == "MONTHLY" else "Anual"
-    plan_label = "🟢 Plano Mensal" if period == "MONTHLY" else "🏆 Plano Anual"
-    price_label = "R$ 19,90/mês" if period == "MONTHLY" else "R$ 190/ano"
-    features_monthly = (
-        "✅ Tudo do período gratuito\n"
-        "✅ Registros ilimitados\n"
-        "✅ Relatórios avançados\n"
-        "✅ Suporte prioritário\n"
-        "✅ Cancele quando quiser"
-    )
-    features_annual = (
-        "✅ Tudo do plano mensal\n"
-        "✅ Economia de R$ 48,80/ano\n"
-        "✅ Suporte VIP\n"
-        "✅ Novos recursos primeiro\n"
-        "✅ 2 meses grátis"
-    )
-    features = features_annual if period == "ANNUAL" else features_monthly
 
+async def _handle_interactive(phone: str, content, client: WhatsAppClient) -> bool:
+    """Seleção de plano via lista interativa (content = ID, ex: "plan_pro_monthly")."""
+    if isinstance(content, str) and content.startswith("plan_"):
+        await _handle_plan_selection(phone, content, client)
+        return True
+    return False
+
+
+async def _handle_text(phone: str, content, user, client: WhatsAppClient) -> bool:
+    """
+    Escolha de plano ou pergunta sobre planos por texto.
+    Retorna True se a mensagem foi tratada aqui (não segue para o MCP).
+    """
+    if not isinstance(content, str) or not _might_be_plan_text(content):
+        return False
+
+    expired = not user.is_license_valid
+
+    # Usuários com plano pago ativo NÃO recebem link de cobrança nem lista de
+    # upgrade — a LLM responde normalmente via MCP com info do plano atual.
+    if not expired and _is_paid(user):
+        return False
+
+    # Normaliza uma vez só; seleção e pergunta sobre planos usam o mesmo texto
+    t = _normalize(content)
+
+    selected = _detect_plan_selection(t)
+    if selected:
+        plan, period = selected
+        await _handle_plan_selection(phone, f"plan_{plan.lower()}_{period.lower()}", client)
+        return True
+
+    if not expired and _is_plan_inquiry(t):
+        await _send_plan_list_active_user(phone, user, client)
+        return True
+
+    return False
+
+
+async def _not_handled(phone: str, content, user, client: WhatsAppClient) -> bool:
+    return False
+
+
+# Roteamento por tipo de mensagem antes do MCP; True = mensagem já tratada
+_HANDLERS: dict[str, Callable[..., Awaitable[bool]]] = {
+    "text": _handle_text,
+}
+
+
+async def _mark_as_read(client: WhatsAppClient, message_id: str) -> None:
+    """Marca a mensagem como lida; falha no ACK só gera aviso."""
     try:
-        license_service = LicenseService()
-        payment_url = await license_service.get_payment_link(phone, plan=plan, period=period)
-
-        plan_msg = (
-            f"✨ *{plan_label} — {period_label}*\n\n"
-            f"💰 *{price_label}*\n\n"
-            f"{features}\n\n"
-            f"🔗 Assine agora pelo link:\n{payment_url}\n\n"
-            f"✅ Após o pagamento, seu plano é ativado automaticamente!"
-        )
-        await client.send_text(phone, plan_msg)
-        logger.info(f"💳 Link gerado para {phone}: {period_label}")
+        await client.mark_as_read(message_id)
     except Exception as e:
-        logger.error(f"Erro ao gerar link para plano {plan}: {e}")
-        await client.send_text(
-            phone,
-            "❌ Erro ao gerar o link de pagamento. Tente novamente em alguns instantes.",
-        )
+        logger.warning(f"Falha ao marcar como lida: {e}")
+
+
+async def _bounded_process_webhook(payload: dict) -> None:
+    async with _processing_semaphore:
+        await _process_webhook(payload)
 
 
 async def _process_webhook(payload: dict):
     """Processa o payload do webhook (executado em background)."""
-    parser = WhatsAppParser()
-    message = parser.extract(payload)
+    message = _parser().extract(payload)
 
     if not message:
         logger.debug("Payload ignorado (sem mensagem de usuário)")
         return
 
+    message_id = message.message_id
+    if not message_id:
+        await _handle_message(message)
+        return
+
+    # A Meta reenvia a mesma mensagem (wamid) em caso de 5xx/timeout
+    event_id = f"whatsapp:{message_id}"
+    if not await webhook_idempotent(event_id):
+        logger.info("🔁 Mensagem duplicada ignorada: {}", message_id)
+        return
+
+    # Falha antes do MCP libera o reenvio. Depois que o MCP começa (transações
+    # gravadas), a chave fica confirmada: o reenvio não registra o gasto de novo
+    started = False
+    finished = False
+
+    async def _mark_started() -> None:
+        nonlocal started
+        started = True
+        await webhook_processed(event_id)
+
+    try:
+        await _handle_message(message, on_processing=_mark_started)
+        finished = True
+    finally:
+        if not started:
+            if finished:
+                await webhook_processed(event_id)
+            else:
+                await release_webhook(event_id)
+
+
+async def _handle_message(
+    message: ParsedMessage,
+    on_processing: Callable[[], Awaitable[None]] | None = None,
+) -> None:
+    """
+    Pipeline de uma mensagem já deduplicada: planos, usuário, MCP e resposta.
+    `on_processing` é chamado logo antes dos efeitos colaterais do MCP
+    (mensagem persistida, transações gravadas).
+    """
     phone = message.phone
     name = message.name
     msg_type = message.type
     content = message.content
     message_id = message.message_id
 
-    logger.info(
-        f"📩 Mensagem recebida: phone={phone}, type={msg_type}, "
-        f"content={content[:50] if isinstance(content, str) else content}"
+    # Log por mensagem: formatação (e o corte do conteúdo) só se o nível emitir
+    logger.opt(lazy=True).info(
+        "📩 Mensagem recebida: phone={}, type={}, content={}",
+        lambda: phone, lambda: msg_type, lambda: _truncate(content),
     )
 
-    client = WhatsAppClient()
+    client = _whatsapp()
 
-    # Marcar mensagem como lida
-    try:
-        await client.mark_as_read(message_id)
-    except Exception as e:
-        logger.warning(f"Falha ao marcar como lida: {e}")
+    # Marcar mensagem como lida (Graph API) em paralelo com o resto do pipeline.
+    # Só a resposta do MCP espera o ACK; nos retornos antecipados ele segue
+    # sozinho (referência forte em _pending_tasks, erros já tratados).
+    ack_task = asyncio.create_task(_mark_as_read(client, message_id))
+    _pending_tasks.add(ack_task)
+    ack_task.add_done_callback(_on_task_done)
 
-    # ── Seleção de plano via lista interativa ──
-    # content vem com o ID (ex: "plan_basico_monthly") para msgs interativas
-    if msg_type == "interactive" and isinstance(content, str) and content.startswith("plan_"):
-        await _handle_plan_selection(phone, content, client)
+    # ── Seleção de plano via lista interativa (não depende do usuário) ──
+    if msg_type == "interactive" and await _handle_interactive(phone, content, client):
         return
 
-    # Verificar/criar usuário
-    license_service = LicenseService()
-    user, is_new_user = await license_service.get_or_create_user(phone, name)
+    # Verificar/criar usuário (banco) enquanto o ACK está em voo
+    user, is_new_user = await _license().get_or_create_user(phone, name)
 
     # Novo usuário — enviar mensagem de boas-vindas
     if is_new_user:
         display_name = name or "usuário"
         expires = user.license_expires_at
         expires_str = expires.strftime("%d/%m/%Y") if expires else "7 dias"
-        welcome_msg = (
-            f"Olá, {display_name}! 👋\n\n"
-            f"🌟 *Bem-vindo(a) ao SuvFin!*\n\n"
-            f"Sou seu assistente de finanças pessoais pelo WhatsApp. "
-            f"Vou te ajudar a organizar sua vida financeira de forma simples e rápida!\n\n"
-            f"🆓 Você ganhou um *período de teste grátis* até *{expires_str}*!\n\n"
-            f"O que posso fazer por você:\n"
-            f"📝 Registrar gastos e receitas\n"
-            f"📊 Gerar relatórios por período e categoria\n"
-            f"💰 Mostrar seu saldo atual\n"
-            f"📸 Analisar comprovantes por foto\n"
-            f"🗑️ Remover e editar lançamentos\n\n"
-            f"Experimente agora! Envie algo como:\n"
-            f'  _"Gastei 50 reais no almoço"_\n'
-            f'  _"Qual meu saldo?"_\n'
-            f'  _"Recebi 3000 de salário"_\n\n'
-            f"Vamos começar? 🚀"
+        welcome_msg = _WELCOME_TEMPLATE.format(
+            display_name=display_name, expires_str=expires_str
         )
         await client.send_text(phone, welcome_msg)
-        logger.info(f"🌟 Novo usuário trial criado e boas-vindas enviada: {phone}")
+        logger.info("🌟 Novo usuário trial criado e boas-vindas enviada: {}", phone)
+        return
+
+    # ── Escolha/pergunta sobre planos (por tipo de mensagem) ──
+    if await _HANDLERS.get(msg_type, _not_handled)(phone, content, user, client):
         return
 
     if not user.is_license_valid:
-        # Verificar se o usuário está escolhendo um plano por texto
-        if msg_type == "text" and isinstance(content, str):
-            selected = _detect_plan_selection(content)
-            if selected:
-                plan, period = selected
-                await _handle_plan_selection(phone, f"plan_{plan.lower()}_{period.lower()}", client)
-                return
-
-        # Enviar lista interativa de planos
+        # Licença expirada: sem MCP, só a lista interativa de planos
         await _send_plan_list(phone, client)
         return
 
-    # ── Usuário ativo perguntando sobre planos/upgrade ──
-    if msg_type == "text" and isinstance(content, str):
-        # Usuários com plano pago ativo NÃO recebem link de cobrança.
-        # Apenas FREE_TRIAL pode ser encaminhado para seleção de plano.
-        from app.models.user import LicenseType as _LicenseType
-        is_paid_user = user.license_type in (
-            _LicenseType.PRO, _LicenseType.BASICO, _LicenseType.PREMIUM
-        )
-
-        if not is_paid_user:
-            # Só tenta detectar seleção de plano para usuários não-pagos
-            selected = _detect_plan_selection(content)
-            if selected:
-                plan, period = selected
-                await _handle_plan_selection(phone, f"plan_{plan.lower()}_{period.lower()}", client)
-                return
-
-        # Checar se está perguntando sobre planos em geral
-        # Usuários com plano pago ativo não recebem lista de upgrade —
-        # a LLM responde normalmente via MCP com info do plano atual.
-        if not is_paid_user and _is_plan_inquiry(content):
-            await _send_plan_list_active_user(phone, user, client)
-            return
+    if on_processing:
+        await on_processing()
 
     # ── Dual-write: persistir mensagem do usuário no PostgreSQL ──
     user_content_str = content if isinstance(content, str) else str(content)
-    msg_service = MessageService()
+    msg_service = _messages()
     asyncio.create_task(
         msg_service.persist_bot_message(
             user_id=str(user.id),
@@ -387,38 +581,44 @@ async def _process_webhook(payload: dict):
     )
 
     # Processar com MCP + LLM
-    from app.models.user import LicenseType as _LT
-    _is_paid = user.license_type in (_LT.PRO, _LT.BASICO, _LT.PREMIUM)
-    processor = MCPProcessor()
-    response = await processor.process(
+    response = await _processor().process(
         user_id=str(user.id),
         phone=phone,
         message_type=msg_type,
         content=content,
         name=name,
-        is_paid_user=_is_paid,
+        is_paid_user=_is_paid(user),
     )
 
-    # Enviar resposta
-    await client.send_text(phone, response.text)
+    reply_text = response.text
+    media = response.media
+    media_type = response.media_type or ""
+
+    # Enviar resposta (depois do ACK: a mensagem aparece lida antes da resposta)
+    await ack_task
+    await client.send_text(phone, reply_text)
+
+    # Mídia (gráfico, PDF) só depois do texto que a apresenta — em ordem
+    if media and media_type:
+        try:
+            if "image" in media_type:
+                await client.send_image(phone, media, caption="📊 Relatório")
+            elif "pdf" in media_type:
+                await client.send_document(
+                    phone, media, "relatorio_suvfin.pdf", caption="📄 Relatório"
+                )
+        except Exception as e:
+            # O texto já foi entregue: falha da mídia não desfaz a resposta
+            logger.error(f"Erro ao enviar mídia para {phone}: {e}")
 
     # ── Dual-write: persistir resposta do bot no PostgreSQL ──
     asyncio.create_task(
         msg_service.persist_bot_message(
             user_id=str(user.id),
-            content=response.text,
+            content=reply_text,
             sender_type="admin",
             message_type="text",
         )
     )
 
-    # Se tiver mídia (gráfico, PDF), enviar
-    if response.media and response.media_type:
-        if "image" in response.media_type:
-            await client.send_image(phone, response.media, caption="📊 Relatório")
-        elif "pdf" in response.media_type:
-            await client.send_document(
-                phone, response.media, "relatorio_suvfin.pdf", caption="📄 Relatório"
-            )
-
-    logger.info(f"✅ Resposta enviada para {phone}")
+    logger.info("✅ Resposta enviada para {}", phone)
@@ -1,12 +1,34 @@
+"""
+Cliente Redis único da aplicação.
+
+Um só ConnectionPool por processo, criado no import. Todo acesso ao Redis
+(middlewares, rotas, serviços) deve importar `redis_client` daqui — nunca
+criar clientes ad hoc com `redis.from_url(...)`, que abririam conexões
+(TCP + AUTH) fora do pool.
+"""
+
 import redis.asyncio as redis
 from app.config.settings import settings
 
-redis_client = redis.from_url(
+# Em rajadas de webhook, com o pool cheio, o comando espera até _POOL_TIMEOUT
+# segundos por uma conexão livre em vez de falhar na hora ("Too many connections")
+_POOL_TIMEOUT = 5
+# Conexões ociosas: keepalive TCP + PING antes de reusar após 30s parada
+# (evita erro no primeiro comando depois de o servidor/LB derrubar a conexão)
+_HEALTH_CHECK_INTERVAL = 30
+
+redis_pool = redis.BlockingConnectionPool.from_url(
     settings.REDIS_URL,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=_POOL_TIMEOUT,
+    socket_keepalive=True,
+    health_check_interval=_HEALTH_CHECK_INTERVAL,
     encoding="utf-8",
     decode_responses=True,
 )
 
+redis_client = redis.Redis(connection_pool=redis_pool)
+
 
 async def get_redis() -> redis.Redis:
     """Dependency para injetar Redis."""
@@ -16,3 +38,4 @@ async def get_redis() -> redis.Redis:
 async def close_redis():
     """Fecha conexão Redis no shutdown."""
     await redis_client.close()
+    await redis_pool.disconnect()
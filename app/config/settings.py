@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from functools import lru_cache
+from functools import cached_property, lru_cache
 
 
 class Settings(BaseSettings):
@@ -25,6 +25,7 @@ class Settings(BaseSettings):
 
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_MAX_CONNECTIONS: int = 50  # Pool compartilhado (workers × concorrência)
 
     # Anthropic
     ANTHROPIC_API_KEY: str = ""
@@ -87,7 +88,7 @@ class Settings(BaseSettings):
     ADMIN_JWT_ALGORITHM: str = "HS256"
     ADMIN_JWT_EXPIRE_MINUTES: int = 480  # 8 horas
 
-    @property
+    @cached_property
     def whatsapp_base_url(self) -> str:
         return f"https://graph.facebook.com/{self.WHATSAPP_API_VERSION}"
 
@@ -95,6 +96,8 @@ class Settings(BaseSettings):
         "env_file": ".env",
         "env_file_encoding": "utf-8",
         "case_sensitive": True,
+        # Lidas uma vez no startup; imutáveis durante a execução
+        "frozen": True,
     }
 
 
@@ -3,20 +3,21 @@ SuvFin — Ponto de entrada da aplicação FastAPI.
 """
 
 from contextlib import asynccontextmanager
+import hashlib
 import os
 
-import sentry_sdk
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
 from loguru import logger
 
+from app.api.responses import ORJSONResponse
 from app.config.settings import settings
 from app.config.database import init_db
 from app.config.redis_client import close_redis
 from app.services.whatsapp.client import WhatsAppClient
-from app.api.routes.webhook import router as webhook_router
+from app.services.payment.abacatepay_service import AbacatePayService
+from app.services.pluggy.client import PluggyClient
+from app.api.routes.webhook import router as webhook_router, close_webhook_services
 from app.api.routes.health import router as health_router
 from app.api.routes.payment import router as payment_router
 from app.api.routes.payment import webhook_router as abacatepay_webhook_router
@@ -31,14 +32,15 @@ from app.api.routes.admin.dashboard import router as admin_dashboard_router
 from app.api.routes.admin.connections import router as admin_connections_router_pluggy
 from app.api.routes.pluggy import router as pluggy_router
 from app.api.routes.pluggy_webhook import router as pluggy_webhook_router
-from app.api.middleware.signature import WebhookSignatureMiddleware
-from app.api.middleware.rate_limit import RateLimitMiddleware
 from app.services.finance.category_service import CategoryService
 from app.services.admin.auth_service import AuthService
 
 
 # --- Sentry (monitoramento de erros) ---
+# Import só quando configurado: sem DSN o worker não carrega o SDK
 if settings.SENTRY_DSN:
+    import sentry_sdk
+
     sentry_sdk.init(
         dsn=settings.SENTRY_DSN,
         traces_sample_rate=0.1,
@@ -75,6 +77,9 @@ async def lifespan(app: FastAPI):
     # SHUTDOWN
     logger.info("🛑 Encerrando SuvFin...")
     await WhatsAppClient.close_http_client()
+    await AbacatePayService.close_http_client()
+    await PluggyClient.close_http_client()
+    await close_webhook_services()
     await close_redis()
     logger.info("✅ Conexões encerradas")
 
@@ -85,6 +90,8 @@ app = FastAPI(
     description="Finanças Pessoais pelo WhatsApp com IA 💰",
     version="1.0.0",
     lifespan=lifespan,
+    # Respostas JSON serializadas por orjson em todas as rotas (não só nos routers)
+    default_response_class=ORJSONResponse,
     docs_url="/docs" if settings.APP_DEBUG else None,
     redoc_url="/redoc" if settings.APP_DEBUG else None,
 )
@@ -97,8 +104,6 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-app.add_middleware(RateLimitMiddleware)
-app.add_middleware(WebhookSignatureMiddleware)
 
 # --- Rotas ---
 app.include_router(health_router)
@@ -124,23 +129,60 @@ app.include_router(pluggy_webhook_router)
 
 # --- Páginas estáticas ---
 static_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
-if os.path.exists(static_dir):
+if os.path.isdir(static_dir):
+    from fastapi.staticfiles import StaticFiles
+
     app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
 
+def _read_static(filename: str) -> bytes | None:
+    path = os.path.join(static_dir, filename)
+    if not os.path.isfile(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# upgrade.html lido uma vez no import (sem open/stat por request); o ETag
+# permite ao navegador revalidar com 304 em vez de baixar de novo
+_UPGRADE_HTML = _read_static("upgrade.html")
+_UPGRADE_HEADERS = (
+    {
+        # MD5 só como impressão digital do conteúdo (aceito em builds FIPS)
+        "ETag": f'"{hashlib.md5(_UPGRADE_HTML, usedforsecurity=False).hexdigest()}"',
+        "Cache-Control": "public, max-age=3600",
+    }
+    if _UPGRADE_HTML is not None
+    else None
+)
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match (RFC 9110): lista separada por vírgula, "*" e validadores fracos (W/)."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _upgrade_html_response(request: Request) -> Response:
+    if _UPGRADE_HTML is None:
+        return Response(status_code=404)
+    if _etag_matches(request.headers.get("if-none-match"), _UPGRADE_HEADERS["ETag"]):
+        return Response(status_code=304, headers=_UPGRADE_HEADERS)
+    return Response(content=_UPGRADE_HTML, media_type="text/html", headers=_UPGRADE_HEADERS)
+
+
 @app.get("/upgrade")
-async def upgrade_page():
+async def upgrade_page(request: Request):
     """Página de upgrade para o plano Premium."""
-    return FileResponse(
-        os.path.join(static_dir, "upgrade.html"),
-        media_type="text/html",
-    )
+    return _upgrade_html_response(request)
 
 
 @app.get("/upgrade/sucesso")
-async def upgrade_success_page():
+async def upgrade_success_page(request: Request):
     """Página de sucesso após pagamento."""
-    return FileResponse(
-        os.path.join(static_dir, "upgrade.html"),
-        media_type="text/html",
-    )
+    return _upgrade_html_response(request)
@@ -1,12 +1,16 @@
 import uuid
 from datetime import datetime
+from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import Column, String, DateTime, Boolean
+from sqlalchemy import String, DateTime, Boolean, Computed, Index
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.config.database import Base
 
+if TYPE_CHECKING:
+    from app.models.transaction import Transaction
+
 
 # Categorias padrão do sistema
 DEFAULT_CATEGORIES = [
@@ -27,14 +31,26 @@ DEFAULT_CATEGORIES = [
 
 class Category(Base):
     __tablename__ = "categories"
-
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    name = Column(String(50), nullable=False)
-    emoji = Column(String(10), nullable=True, default="📦")
-    color = Column(String(7), nullable=True, default="#AEB6BF")
-    is_default = Column(Boolean, default=True)
-    user_id = Column(UUID(as_uuid=True), nullable=True)  # null = global
-    created_at = Column(DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        # Busca por nome sem ilike: igualdade em name_norm (b-tree)
+        Index("ix_categories_name_norm_user", "name_norm", "user_id"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    name: Mapped[str] = mapped_column(String(50), nullable=False)
+    # lower(name) gerado no banco — somente leitura no ORM
+    name_norm: Mapped[Optional[str]] = mapped_column(
+        String(50), Computed("lower(name)", persisted=True)
+    )
+    emoji: Mapped[Optional[str]] = mapped_column(String(10), nullable=True, default="📦")
+    color: Mapped[Optional[str]] = mapped_column(String(7), nullable=True, default="#AEB6BF")
+    is_default: Mapped[Optional[bool]] = mapped_column(Boolean, default=True)
+    user_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True), nullable=True
+    )  # null = global
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow)
 
     # Relationships
-    transactions = relationship("Transaction", back_populates="category")
+    transactions: Mapped[list["Transaction"]] = relationship(back_populates="category")
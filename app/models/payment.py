@@ -7,9 +7,10 @@ from datetime import datetime
 from enum import Enum as PyEnum
 
 from sqlalchemy import (
-    Column, String, DateTime, Integer, Enum, ForeignKey, Text
+    Column, String, DateTime, Integer, Enum, ForeignKey, Index, Text, text
 )
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
 
 from app.config.database import Base
 
@@ -29,6 +30,20 @@ class BillingPeriod(PyEnum):
 
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        # Cobrança pendente do usuário (create_payment_link)
+        Index("ix_payments_user_status", "user_id", "status"),
+        # Último pagamento do usuário (get_payment_status) — index-only scan:
+        # as colunas lidas pelo endpoint vêm do próprio índice (INCLUDE)
+        Index(
+            "ix_payments_user_created_at",
+            "user_id",
+            text("created_at DESC"),
+            postgresql_include=[
+                "plan_type", "billing_period", "abacatepay_billing_id", "status",
+            ],
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(
@@ -47,8 +62,17 @@ class Payment(Base):
 
     # Valores
     amount_cents = Column(Integer, nullable=False)
+    # VARCHAR + CHECK (sem ENUM nativo do Postgres); no Python continua PaymentStatus
     status = Column(
-        Enum(PaymentStatus), nullable=False, default=PaymentStatus.PENDING
+        Enum(
+            PaymentStatus,
+            native_enum=False,
+            length=20,
+            create_constraint=True,
+            name="ck_payments_status",
+        ),
+        nullable=False,
+        default=PaymentStatus.PENDING,
     )
     payment_method = Column(String(20), default="PIX")
     payment_url = Column(Text, nullable=True)
@@ -57,3 +81,6 @@ class Payment(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     paid_at = Column(DateTime, nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    user = relationship("User")
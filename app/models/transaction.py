@@ -1,15 +1,19 @@
 import uuid
 from datetime import datetime, date
+from decimal import Decimal
 from enum import Enum as PyEnum
+from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import (
-    Column, String, Numeric, Date, DateTime, ForeignKey, Enum, Text, Index
-)
+from sqlalchemy import String, Numeric, Date, DateTime, ForeignKey, Enum, Index, Text, text
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.config.database import Base
 
+if TYPE_CHECKING:
+    from app.models.category import Category
+    from app.models.user import User
+
 
 class TransactionType(PyEnum):
     INCOME = "INCOME"
@@ -23,32 +27,70 @@ class TransactionProfile(PyEnum):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Índice simples em user_id: checagem da FK ao apagar usuário (cascade)
+        # e consultas que não filtram deleted_at
+        Index("ix_transactions_user_id", "user_id"),
+        # Consultas do app filtram lançamentos ativos — índices parciais
+        # (WHERE deleted_at IS NULL) ao lado do índice simples.
+        # Relatórios/saldo por período: totais saem do próprio índice (INCLUDE)
+        Index(
+            "ix_transactions_user_date_active",
+            "user_id",
+            "date",
+            postgresql_include=["type", "amount", "profile", "category_id"],
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        # Últimos lançamentos / busca: ORDER BY created_at DESC LIMIT n
+        Index(
+            "ix_transactions_user_created_active",
+            "user_id",
+            text("created_at DESC"),
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(
-        UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
     )
-    type = Column(Enum(TransactionType), nullable=False)
-    amount = Column(Numeric(12, 2), nullable=False)
-    description = Column(String(255), nullable=True)
-    date = Column(Date, nullable=False, default=date.today)
-    category_id = Column(
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id"), nullable=False
+    )
+    # VARCHAR + CHECK (sem ENUM nativo do Postgres); no Python continua TransactionType
+    type: Mapped[TransactionType] = mapped_column(
+        Enum(
+            TransactionType,
+            native_enum=False,
+            length=20,
+            create_constraint=True,
+            name="ck_transactions_type",
+        ),
+        nullable=False,
+    )
+    amount: Mapped[Decimal] = mapped_column(Numeric(12, 2), nullable=False)
+    description: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    date: Mapped["date"] = mapped_column(Date, nullable=False, default=date.today)
+    category_id: Mapped[Optional[uuid.UUID]] = mapped_column(
         UUID(as_uuid=True), ForeignKey("categories.id"), nullable=True
     )
-    receipt_url = Column(Text, nullable=True)
-    profile = Column(
+    receipt_url: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    profile: Mapped[TransactionProfile] = mapped_column(
         Enum(TransactionProfile, name="profile_type"),
         nullable=False,
         default=TransactionProfile.PF,
         server_default="PF",
     )
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    deleted_at = Column(DateTime, nullable=True)  # Soft delete
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)  # Soft delete
 
     # Relationships
-    user = relationship("User", back_populates="transactions")
-    category = relationship("Category", back_populates="transactions", lazy="selectin")
+    user: Mapped["User"] = relationship(back_populates="transactions")
+    category: Mapped[Optional["Category"]] = relationship(
+        back_populates="transactions", lazy="selectin"
+    )
 
     @property
     def is_deleted(self) -> bool:
@@ -19,14 +19,35 @@ class LicenseType(PyEnum):
     PREMIUM = "PREMIUM"
 
 
+# Planos pagos (sem data de expiração = válidos indefinidamente)
+PAID_LICENSE_TYPES = frozenset({LicenseType.BASICO, LicenseType.PRO, LicenseType.PREMIUM})
+
+# Limite de transações por tipo de licença (None = ilimitado)
+_MAX_TRANSACTIONS = {
+    LicenseType.FREE_TRIAL: 50,
+    LicenseType.BASICO: 100,
+    LicenseType.PRO: None,
+    LicenseType.PREMIUM: None,
+}
+
+
 class User(Base):
     __tablename__ = "users"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     phone = Column(String(20), unique=True, nullable=False, index=True)
     name = Column(String(100), nullable=True)
+    # VARCHAR + CHECK (sem ENUM nativo do Postgres); no Python continua LicenseType
     license_type = Column(
-        Enum(LicenseType), nullable=False, default=LicenseType.FREE_TRIAL
+        Enum(
+            LicenseType,
+            native_enum=False,
+            length=20,
+            create_constraint=True,
+            name="ck_users_license_type",
+        ),
+        nullable=False,
+        default=LicenseType.FREE_TRIAL,
     )
     license_expires_at = Column(Date, nullable=True)
     is_active = Column(Boolean, default=True)
@@ -47,7 +68,11 @@ class User(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
-    transactions = relationship("Transaction", back_populates="user", lazy="selectin")
+    # Nunca carregada junto com o usuário (cada mensagem busca o usuário):
+    # lançamentos são sempre consultados explicitamente pelos services
+    transactions = relationship(
+        "Transaction", back_populates="user", lazy="raise", passive_deletes=True
+    )
     subscription = relationship(
         "Subscription", back_populates="user", uselist=False, lazy="selectin"
     )
@@ -58,22 +83,13 @@ class User(Base):
     @property
     def is_license_valid(self) -> bool:
         """Verifica se a licença está ativa."""
-        if self.license_type in (LicenseType.BASICO, LicenseType.PRO, LicenseType.PREMIUM):
-            # Planos pagos: verificar expiração se houver
-            if self.license_expires_at:
-                return self.license_expires_at >= date.today()
-            return True  # Sem data = válido
-        if self.license_expires_at and self.license_expires_at >= date.today():
-            return True
-        return False
+        expires = self.license_expires_at
+        if expires is None:
+            # Sem data: plano pago é válido, trial não (sem consultar o relógio)
+            return self.license_type in PAID_LICENSE_TYPES
+        return expires >= date.today()
 
     @property
     def max_transactions(self) -> int | None:
         """Limite de transações por tipo de licença."""
-        limits = {
-            LicenseType.FREE_TRIAL: 50,
-            LicenseType.BASICO: 100,
-            LicenseType.PRO: None,   # Ilimitado
-            LicenseType.PREMIUM: None,  # Ilimitado
-        }
-        return limits.get(self.license_type, 50)
+        return _MAX_TRANSACTIONS.get(self.license_type, 50)
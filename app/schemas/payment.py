@@ -6,7 +6,7 @@ from datetime import datetime
 from enum import Enum as PyEnum
 from typing import Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 
 # ------------------------------------------------------------------
@@ -105,7 +105,7 @@ class AbacatePayBilling(BaseModel):
     created_at: Optional[str] = Field(None, alias="createdAt")
     updated_at: Optional[str] = Field(None, alias="updatedAt")
 
-    model_config = {"populate_by_name": True}
+    model_config = {"populate_by_name": True, "frozen": True}
 
 
 class AbacatePayWebhookPayload(BaseModel):
@@ -113,6 +113,31 @@ class AbacatePayWebhookPayload(BaseModel):
     data: AbacatePayBilling
 
 
+class AbacatePayWebhookEvent(BaseModel):
+    """
+    Envelope do webhook do AbacatePay, validado em uma única passada.
+    Tolerante ao formato: a cobrança pode vir em data.billing, em data
+    ou no nível superior do payload.
+    """
+    event: Optional[str] = None
+    id: Optional[str] = None
+    status: Optional[str] = None
+    data: dict = {}
+
+    # id/status numéricos viram string em vez de rejeitar um evento válido
+    model_config = {"coerce_numbers_to_str": True}
+
+    @field_validator("data", mode="before")
+    @classmethod
+    def _data_as_dict(cls, value):
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def billing(self) -> dict:
+        """Dados da cobrança: data.billing ou o próprio data."""
+        return self.data.get("billing", self.data)
+
+
 # ------------------------------------------------------------------
 # Response schemas
 # ------------------------------------------------------------------
@@ -45,8 +45,7 @@ class TransactionResponse(BaseModel):
     profile: str = "PF"
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = {"from_attributes": True, "frozen": True}
 
 
 class ReportPeriod(BaseModel):
@@ -44,8 +44,7 @@ class WhatsAppMessage(BaseModel):
     image: Optional[WhatsAppImageMessage] = None
     document: Optional[WhatsAppDocumentMessage] = None
 
-    class Config:
-        populate_by_name = True
+    model_config = {"populate_by_name": True, "frozen": True}
 
 
 class WhatsAppMetadata(BaseModel):
@@ -67,6 +66,8 @@ class WhatsAppValue(BaseModel):
     messages: Optional[list[WhatsAppMessage]] = None
     statuses: Optional[list[WhatsAppStatus]] = None
 
+    model_config = {"frozen": True}
+
 
 class WhatsAppChange(BaseModel):
     field: str
@@ -96,3 +97,6 @@ class ParsedMessage(BaseModel):
     content: str  # texto ou media_id
     caption: Optional[str] = None
     timestamp: str
+
+    # Só leitura depois de extraída do payload
+    model_config = {"frozen": True}
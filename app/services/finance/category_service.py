@@ -5,12 +5,16 @@ Serviço de categorias.
 from uuid import UUID
 from typing import Optional
 
-from sqlalchemy import select, or_
+from sqlalchemy import func, insert, select, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config.database import async_session
 from app.models.category import Category, DEFAULT_CATEGORIES
 
+_DEFAULT_CATEGORY_NAMES = tuple(c["name"] for c in DEFAULT_CATEGORIES)
+# Emoji padrão por nome normalizado — lookup O(1) ao criar categoria custom
+_DEFAULT_EMOJI_BY_NAME = {c["name"].casefold(): c["emoji"] for c in DEFAULT_CATEGORIES}
+
 
 class CategoryService:
     """Gerencia categorias de transações."""
@@ -24,7 +28,7 @@ class CategoryService:
         """Busca categoria por nome (case-insensitive) ou cria uma nova."""
         # Buscar nas categorias padrão e do usuário
         stmt = select(Category).where(
-            Category.name.ilike(name),
+            Category.name_norm == func.lower(name),
             or_(
                 Category.user_id.is_(None),  # Padrão
                 Category.user_id == UUID(user_id),  # Custom do usuário
@@ -37,11 +41,7 @@ class CategoryService:
             return category
 
         # Tentar encontrar emoji padrão
-        emoji = "📦"
-        for default_cat in DEFAULT_CATEGORIES:
-            if default_cat["name"].lower() == name.lower():
-                emoji = default_cat["emoji"]
-                break
+        emoji = _DEFAULT_EMOJI_BY_NAME.get(name.casefold(), "📦")
 
         # Criar nova categoria custom
         category = Category(
@@ -95,7 +95,7 @@ class CategoryService:
         """
         # Verificar duplicata
         stmt = select(Category).where(
-            Category.name.ilike(name),
+            Category.name_norm == func.lower(name),
             or_(
                 Category.user_id.is_(None),
                 Category.user_id == UUID(user_id),
@@ -130,7 +130,7 @@ class CategoryService:
         """
         # Checar se existe como padrão
         default_stmt = select(Category).where(
-            Category.name.ilike(name),
+            Category.name_norm == func.lower(name),
             Category.user_id.is_(None),
         )
         result = await session.execute(default_stmt)
@@ -139,7 +139,7 @@ class CategoryService:
 
         # Buscar categoria custom do usuário
         custom_stmt = select(Category).where(
-            Category.name.ilike(name),
+            Category.name_norm == func.lower(name),
             Category.user_id == UUID(user_id),
             Category.is_default.is_(False),
         )
@@ -155,20 +155,21 @@ class CategoryService:
     async def seed_defaults(self):
         """Cria as categorias padrão no banco (rodar 1x no setup)."""
         async with async_session() as session:
-            for cat_data in DEFAULT_CATEGORIES:
-                exists_stmt = select(Category).where(
-                    Category.name == cat_data["name"],
+            # Uma consulta para as que já existem + um INSERT em lote para as que faltam
+            result = await session.execute(
+                select(Category.name).where(
+                    Category.name.in_(_DEFAULT_CATEGORY_NAMES),
                     Category.is_default.is_(True),
                 )
-                result = await session.execute(exists_stmt)
-                if not result.scalar_one_or_none():
-                    category = Category(
-                        name=cat_data["name"],
-                        emoji=cat_data["emoji"],
-                        color=cat_data["color"],
-                        is_default=True,
-                        user_id=None,
-                    )
-                    session.add(category)
+            )
+            existing = set(result.scalars().all())
+
+            missing = [
+                {**cat_data, "is_default": True, "user_id": None}
+                for cat_data in DEFAULT_CATEGORIES
+                if cat_data["name"] not in existing
+            ]
+            if missing:
+                await session.execute(insert(Category), missing)
 
             await session.commit()
@@ -7,7 +7,7 @@ from decimal import Decimal
 from uuid import UUID
 from typing import Optional
 
-from sqlalchemy import select, func, desc, case
+from sqlalchemy import Float, select, func, desc, case, type_coerce
 from sqlalchemy.orm import selectinload
 
 from app.config.database import async_session
@@ -39,52 +39,54 @@ class ReportService:
             if profile and profile in ("PF", "PJ"):
                 base_where.append(Transaction.profile == TransactionProfile(profile))
 
-            # Totais por tipo
-            totals_stmt = select(
-                Transaction.type,
-                func.sum(Transaction.amount).label("total"),
-                func.count(Transaction.id).label("count"),
-            ).where(*base_where).group_by(Transaction.type)
-
-            result = await session.execute(totals_stmt)
-            rows = result.all()
-
-            total_income = 0.0
-            total_expense = 0.0
-            tx_count = 0
-
-            for row in rows:
-                amount = float(row.total) if row.total else 0.0
-                count = row.count or 0
-                if row.type == TransactionType.INCOME:
-                    total_income = amount
-                else:
-                    total_expense = amount
-                tx_count += count
-
-            # Por categoria (apenas expenses)
-            cat_stmt = (
+            # Uma única ida ao banco: agregado no grão tipo × perfil × categoria;
+            # totais, categorias e breakdown por perfil saem das mesmas linhas
+            stmt = (
                 select(
+                    Transaction.type,
+                    Transaction.profile,
                     Category.name,
                     Category.emoji,
                     func.sum(Transaction.amount).label("total"),
                     func.count(Transaction.id).label("count"),
                 )
                 .join(Category, Transaction.category_id == Category.id, isouter=True)
-                .where(*base_where, Transaction.type == TransactionType.EXPENSE)
-                .group_by(Category.name, Category.emoji)
-                .order_by(desc(func.sum(Transaction.amount)))
+                .where(*base_where)
+                .group_by(
+                    Transaction.type, Transaction.profile, Category.name, Category.emoji
+                )
             )
 
-            cat_result = await session.execute(cat_stmt)
+            result = await session.execute(stmt)
+            rows = result.all()
+
+            totals = {TransactionType.INCOME: Decimal(0), TransactionType.EXPENSE: Decimal(0)}
+            tx_count = 0
+            # Por categoria (apenas expenses), somando os perfis
+            cat_totals: dict[tuple, list] = {}
+
+            for row in rows:
+                amount = row.total or Decimal(0)
+                totals[row.type] += amount
+                tx_count += row.count or 0
+                if row.type == TransactionType.EXPENSE:
+                    acc = cat_totals.setdefault((row.name, row.emoji), [Decimal(0), 0])
+                    acc[0] += amount
+                    acc[1] += row.count
+
+            total_income = float(totals[TransactionType.INCOME])
+            total_expense = float(totals[TransactionType.EXPENSE])
+
             by_category = [
                 {
-                    "name": row.name or "Sem categoria",
-                    "emoji": row.emoji or "📦",
-                    "total": float(row.total),
-                    "count": row.count,
+                    "name": name or "Sem categoria",
+                    "emoji": emoji or "📦",
+                    "total": float(total),
+                    "count": count,
                 }
-                for row in cat_result.all()
+                for (name, emoji), (total, count) in sorted(
+                    cat_totals.items(), key=lambda item: item[1][0], reverse=True
+                )
             ]
 
             report = {
@@ -95,11 +97,9 @@ class ReportService:
                 "by_category": by_category,
             }
 
-            # Breakdown por perfil quando não filtrado
+            # Breakdown por perfil quando não filtrado — mesmas linhas, sem nova query
             if not profile:
-                report["by_profile"] = await self._profile_breakdown(
-                    session, uid, start_date, end_date
-                )
+                report["by_profile"] = self._breakdown_from_rows(rows)
 
             return report
 
@@ -115,13 +115,24 @@ class ReportService:
         async with async_session() as session:
             uid = UUID(user_id)
 
+            category_total = func.sum(Transaction.amount)
             stmt = (
                 select(
                     Category.name,
                     Category.emoji,
-                    func.sum(Transaction.amount).label("total"),
+                    category_total.label("total"),
                     func.count(Transaction.id).label("count"),
                     func.avg(Transaction.amount).label("average"),
+                    # Percentual sobre o total geral calculado no próprio banco:
+                    # janela sobre as linhas já agrupadas (SUM(SUM(amount)) OVER ()).
+                    # type_coerce não muda o SQL (numeric / numeric no Postgres já
+                    # vem com escala completa): só faz o resultado chegar como float,
+                    # sem o processador Numeric(…, 2) herdado de amount — que em
+                    # drivers sem decimal nativo (ex.: SQLite) arredondaria para 2 casas
+                    type_coerce(
+                        category_total * 100 / func.nullif(func.sum(category_total).over(), 0),
+                        Float,
+                    ).label("percentage"),
                 )
                 .join(Category, Transaction.category_id == Category.id, isouter=True)
                 .where(
@@ -140,26 +151,23 @@ class ReportService:
                 stmt = stmt.where(Category.name.ilike(f"%{category_filter}%"))
 
             stmt = stmt.group_by(Category.name, Category.emoji).order_by(
-                desc(func.sum(Transaction.amount))
+                desc(category_total)
             )
 
             result = await session.execute(stmt)
             rows = result.all()
 
-            # Calcular total geral para percentuais
-            grand_total = sum(float(r.total) for r in rows) if rows else 1
-
-            categories = []
-            for row in rows:
-                total = float(row.total)
-                categories.append({
+            categories = [
+                {
                     "name": row.name or "Sem categoria",
                     "emoji": row.emoji or "📦",
-                    "total": total,
+                    "total": float(row.total),
                     "count": row.count,
                     "average": float(row.average) if row.average else 0.0,
-                    "percentage": (total / grand_total) * 100,
-                })
+                    "percentage": float(row.percentage) if row.percentage else 0.0,
+                }
+                for row in rows
+            ]
 
             # Se filtro de categoria, buscar últimas transações
             if category_filter and categories:
@@ -257,24 +265,34 @@ class ReportService:
 
         stmt = stmt.group_by(Transaction.profile, Transaction.type)
         result = await session.execute(stmt)
-        rows = result.all()
-
-        breakdown: dict[str, dict] = {
-            "PF": {"total_income": 0.0, "total_expense": 0.0, "balance": 0.0},
-            "PJ": {"total_income": 0.0, "total_expense": 0.0, "balance": 0.0},
+        return self._breakdown_from_rows(result.all())
+
+    @staticmethod
+    def _breakdown_from_rows(rows) -> dict:
+        """Soma linhas agregadas (profile, type, total) nos totais de PF e PJ."""
+        sums = {
+            (prof, tx_type): Decimal(0)
+            for prof in ("PF", "PJ")
+            for tx_type in (TransactionType.INCOME, TransactionType.EXPENSE)
         }
 
         for row in rows:
             prof_key = row.profile.value if row.profile else "PF"
-            amount = float(row.total) if row.total else 0.0
-            if row.type == TransactionType.INCOME:
-                breakdown[prof_key]["total_income"] += amount
-            else:
-                breakdown[prof_key]["total_expense"] += amount
-
-        for prof in breakdown:
-            breakdown[prof]["balance"] = (
-                breakdown[prof]["total_income"] - breakdown[prof]["total_expense"]
+            tx_type = (
+                TransactionType.INCOME
+                if row.type == TransactionType.INCOME
+                else TransactionType.EXPENSE
             )
+            sums[prof_key, tx_type] += row.total or Decimal(0)
+
+        breakdown: dict[str, dict] = {}
+        for prof in ("PF", "PJ"):
+            income = float(sums[prof, TransactionType.INCOME])
+            expense = float(sums[prof, TransactionType.EXPENSE])
+            breakdown[prof] = {
+                "total_income": income,
+                "total_expense": expense,
+                "balance": income - expense,
+            }
 
         return breakdown
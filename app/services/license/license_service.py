@@ -12,6 +12,15 @@ from loguru import logger
 from app.config.database import async_session
 from app.models.user import User, LicenseType
 
+# Aviso de limite atingido, montado uma única vez no import
+_LIMIT_REACHED_TEMPLATE = (
+    "Você atingiu o limite de {max_tx} lançamentos do seu plano. "
+    "Faça upgrade para desbloquear mais! 🚀\n\n"
+    "🟢 *Plano Mensal* — R$ 19,90/mês\n"
+    "🏆 *Plano Anual* — R$ 190/ano (economize 20%!)\n\n"
+    'Envie _"Quero fazer upgrade"_ para ver as opções!'
+)
+
 
 class LicenseService:
     """Gerencia licenças e validação de usuários."""
@@ -72,11 +81,6 @@ class LicenseService:
         abacatepay_customer_id: str = None,
     ) -> bool:
         """Faz upgrade da licença (Mensal ou Anual)."""
-        from datetime import timedelta
-
-        # Plano único — todos viram PRO
-        license_type = LicenseType.PRO
-
         async with async_session() as session:
             stmt = select(User).where(User.id == UUID(user_id))
             result = await session.execute(stmt)
@@ -85,20 +89,34 @@ class LicenseService:
             if not user:
                 return False
 
-            user.license_type = license_type
+            self.apply_plan(user, plan, period, abacatepay_customer_id)
+            await session.commit()
+            return True
+
+    def apply_plan(
+        self,
+        user: User,
+        plan: str = "PRO",
+        period: str = "MONTHLY",
+        abacatepay_customer_id: str = None,
+    ) -> None:
+        """
+        Aplica o upgrade em um usuário já carregado na sessão do chamador.
+        Não faz SELECT nem commit — a transação é do chamador.
+        """
+        # Plano único — todos viram PRO
+        user.license_type = LicenseType.PRO
 
-            # Definir expiração baseada no período
-            if period.upper() == "ANNUAL":
-                user.license_expires_at = date.today() + timedelta(days=365)
-            else:
-                user.license_expires_at = date.today() + timedelta(days=30)
+        # Definir expiração baseada no período
+        if period.upper() == "ANNUAL":
+            user.license_expires_at = date.today() + timedelta(days=365)
+        else:
+            user.license_expires_at = date.today() + timedelta(days=30)
 
-            if abacatepay_customer_id:
-                user.abacatepay_customer_id = abacatepay_customer_id
+        if abacatepay_customer_id:
+            user.abacatepay_customer_id = abacatepay_customer_id
 
-            await session.commit()
-            logger.info(f"Upgrade para {plan} ({period}): {user.phone}")
-            return True
+        logger.info(f"Upgrade para {plan} ({period}): {user.phone}")
 
     async def upgrade_to_premium(
         self, user_id: str, abacatepay_customer_id: str = None
@@ -158,13 +176,7 @@ class LicenseService:
             if current_count >= max_tx:
                 return {
                     "allowed": False,
-                    "reason": (
-                        f"Você atingiu o limite de {max_tx} lançamentos do seu plano. "
-                        f"Faça upgrade para desbloquear mais! 🚀\n\n"
-                        f"🟢 *Plano Mensal* — R$ 19,90/mês\n"
-                        f"🏆 *Plano Anual* — R$ 190/ano (economize 20%!)\n\n"
-                        f"Envie _\"Quero fazer upgrade\"_ para ver as opções!"
-                    ),
+                    "reason": _LIMIT_REACHED_TEMPLATE.format(max_tx=max_tx),
                     "current": current_count,
                     "limit": max_tx,
                 }
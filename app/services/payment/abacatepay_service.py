@@ -19,6 +19,8 @@ class AbacatePayService:
 
     BASE_URL = "https://api.abacatepay.com/v1"
 
+    _http_client: httpx.AsyncClient | None = None
+
     def __init__(self):
         self.api_key = settings.ABACATEPAY_API_KEY
         self.headers = {
@@ -27,6 +29,18 @@ class AbacatePayService:
             "Accept": "application/json",
         }
 
+    @classmethod
+    def _get_http_client(cls) -> httpx.AsyncClient:
+        if cls._http_client is None or cls._http_client.is_closed:
+            cls._http_client = httpx.AsyncClient(timeout=30)
+        return cls._http_client
+
+    @classmethod
+    async def close_http_client(cls):
+        if cls._http_client and not cls._http_client.is_closed:
+            await cls._http_client.aclose()
+            cls._http_client = None
+
     # ------------------------------------------------------------------
     # Clientes
     # ------------------------------------------------------------------
@@ -51,37 +65,37 @@ class AbacatePayService:
             "taxId": tax_id,
         }
 
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.post(
-                f"{self.BASE_URL}/customer/create",
-                json=payload,
-                headers=self.headers,
-            )
+        client = self._get_http_client()
+        response = await client.post(
+            f"{self.BASE_URL}/customer/create",
+            json=payload,
+            headers=self.headers,
+        )
 
-            if response.status_code == 200:
-                data = response.json()
-                customer = data.get("data") or {}
-                if not customer:
-                    logger.error(
-                        f"❌ AbacatePay retornou resposta sem dados de cliente: {data}"
-                    )
-                    raise AbacatePayError(
-                        f"Resposta sem dados de cliente: {data.get('error', 'unknown')}",
-                        status_code=response.status_code,
-                        response_body=response.text,
-                    )
-                logger.info(f"🥑 Cliente criado no AbacatePay: {customer.get('id')}")
-                return customer
-            else:
+        if response.status_code == 200:
+            data = response.json()
+            customer = data.get("data") or {}
+            if not customer:
                 logger.error(
-                    f"❌ Erro ao criar cliente AbacatePay: "
-                    f"{response.status_code} — {response.text}"
+                    f"❌ AbacatePay retornou resposta sem dados de cliente: {data}"
                 )
                 raise AbacatePayError(
-                    f"Falha ao criar cliente: {response.status_code}",
+                    f"Resposta sem dados de cliente: {data.get('error', 'unknown')}",
                     status_code=response.status_code,
                     response_body=response.text,
                 )
+            logger.info(f"🥑 Cliente criado no AbacatePay: {customer.get('id')}")
+            return customer
+        else:
+            logger.error(
+                f"❌ Erro ao criar cliente AbacatePay: "
+                f"{response.status_code} — {response.text}"
+            )
+            raise AbacatePayError(
+                f"Falha ao criar cliente: {response.status_code}",
+                status_code=response.status_code,
+                response_body=response.text,
+            )
 
     async def list_customers(self) -> list[dict]:
         """
@@ -89,22 +103,22 @@ class AbacatePayService:
 
         GET /customer/list
         """
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.get(
-                f"{self.BASE_URL}/customer/list",
-                headers=self.headers,
-            )
+        client = self._get_http_client()
+        response = await client.get(
+            f"{self.BASE_URL}/customer/list",
+            headers=self.headers,
+        )
 
-            if response.status_code == 200:
-                data = response.json()
-                return data.get("data", [])
-            else:
-                logger.error(f"❌ Erro ao listar clientes: {response.status_code}")
-                raise AbacatePayError(
-                    f"Falha ao listar clientes: {response.status_code}",
-                    status_code=response.status_code,
-                    response_body=response.text,
-                )
+        if response.status_code == 200:
+            data = response.json()
+            return data.get("data", [])
+        else:
+            logger.error(f"❌ Erro ao listar clientes: {response.status_code}")
+            raise AbacatePayError(
+                f"Falha ao listar clientes: {response.status_code}",
+                status_code=response.status_code,
+                response_body=response.text,
+            )
 
     # ------------------------------------------------------------------
     # Cobranças (Billing)
@@ -154,41 +168,41 @@ class AbacatePayService:
         elif customer:
             payload["customer"] = customer
 
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.post(
-                f"{self.BASE_URL}/billing/create",
-                json=payload,
-                headers=self.headers,
-            )
+        client = self._get_http_client()
+        response = await client.post(
+            f"{self.BASE_URL}/billing/create",
+            json=payload,
+            headers=self.headers,
+        )
 
-            if response.status_code in (200, 201):
-                data = response.json()
-                logger.debug(f"AbacatePay billing response: {data}")
-                billing = data.get("data") or {}
-                if not billing or not billing.get("url"):
-                    logger.error(
-                        f"❌ AbacatePay retornou resposta sem dados válidos: {data}"
-                    )
-                    raise AbacatePayError(
-                        "AbacatePay retornou resposta sem dados de cobrança",
-                        status_code=response.status_code,
-                        response_body=response.text,
-                    )
-                logger.info(
-                    f"🥑 Cobrança criada: {billing.get('id')} — "
-                    f"R$ {price_cents / 100:.2f} — URL: {billing.get('url')}"
-                )
-                return billing
-            else:
+        if response.status_code in (200, 201):
+            data = response.json()
+            logger.debug(f"AbacatePay billing response: {data}")
+            billing = data.get("data") or {}
+            if not billing or not billing.get("url"):
                 logger.error(
-                    f"❌ Erro ao criar cobrança AbacatePay: "
-                    f"{response.status_code} — {response.text}"
+                    f"❌ AbacatePay retornou resposta sem dados válidos: {data}"
                 )
                 raise AbacatePayError(
-                    f"Falha ao criar cobrança: {response.status_code}",
+                    "AbacatePay retornou resposta sem dados de cobrança",
                     status_code=response.status_code,
                     response_body=response.text,
                 )
+            logger.info(
+                f"🥑 Cobrança criada: {billing.get('id')} — "
+                f"R$ {price_cents / 100:.2f} — URL: {billing.get('url')}"
+            )
+            return billing
+        else:
+            logger.error(
+                f"❌ Erro ao criar cobrança AbacatePay: "
+                f"{response.status_code} — {response.text}"
+            )
+            raise AbacatePayError(
+                f"Falha ao criar cobrança: {response.status_code}",
+                status_code=response.status_code,
+                response_body=response.text,
+            )
 
     async def list_billings(self) -> list[dict]:
         """
@@ -196,22 +210,22 @@ class AbacatePayService:
 
         GET /billing/list
         """
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.get(
-                f"{self.BASE_URL}/billing/list",
-                headers=self.headers,
-            )
+        client = self._get_http_client()
+        response = await client.get(
+            f"{self.BASE_URL}/billing/list",
+            headers=self.headers,
+        )
 
-            if response.status_code == 200:
-                data = response.json()
-                return data.get("data", [])
-            else:
-                logger.error(f"❌ Erro ao listar cobranças: {response.status_code}")
-                raise AbacatePayError(
-                    f"Falha ao listar cobranças: {response.status_code}",
-                    status_code=response.status_code,
-                    response_body=response.text,
-                )
+        if response.status_code == 200:
+            data = response.json()
+            return data.get("data", [])
+        else:
+            logger.error(f"❌ Erro ao listar cobranças: {response.status_code}")
+            raise AbacatePayError(
+                f"Falha ao listar cobranças: {response.status_code}",
+                status_code=response.status_code,
+                response_body=response.text,
+            )
 
     # ------------------------------------------------------------------
     # Webhook helpers
@@ -31,12 +31,26 @@ class PluggyError(Exception):
 class PluggyClient:
     """Cliente async para a REST API do Pluggy."""
 
+    _http_client: httpx.AsyncClient | None = None
+
     def __init__(self):
         self.base_url = settings.PLUGGY_BASE_URL
         self.client_id = settings.PLUGGY_CLIENT_ID
         self.client_secret = settings.PLUGGY_CLIENT_SECRET
         self.webhook_url = settings.PLUGGY_WEBHOOK_URL
 
+    @classmethod
+    def _get_http_client(cls) -> httpx.AsyncClient:
+        if cls._http_client is None or cls._http_client.is_closed:
+            cls._http_client = httpx.AsyncClient(timeout=30)
+        return cls._http_client
+
+    @classmethod
+    async def close_http_client(cls):
+        if cls._http_client and not cls._http_client.is_closed:
+            await cls._http_client.aclose()
+            cls._http_client = None
+
     # ------------------------------------------------------------------
     # Autenticação
     # ------------------------------------------------------------------
@@ -53,28 +67,28 @@ class PluggyClient:
 
     async def _authenticate(self) -> str:
         """POST /auth → apiKey (expira 2h)."""
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.post(
-                f"{self.base_url}/auth",
-                json={
-                    "clientId": self.client_id,
-                    "clientSecret": self.client_secret,
-                },
+        client = self._get_http_client()
+        response = await client.post(
+            f"{self.base_url}/auth",
+            json={
+                "clientId": self.client_id,
+                "clientSecret": self.client_secret,
+            },
+        )
+        if response.status_code == 200:
+            data = response.json()
+            api_key = data.get("apiKey")
+            if not api_key:
+                raise PluggyError("Pluggy auth retornou sem apiKey", 200, response.text)
+            logger.info("🔑 Pluggy API autenticada com sucesso")
+            return api_key
+        else:
+            logger.error(f"❌ Pluggy auth falhou: {response.status_code} — {response.text}")
+            raise PluggyError(
+                f"Falha na autenticação Pluggy: {response.status_code}",
+                response.status_code,
+                response.text,
             )
-            if response.status_code == 200:
-                data = response.json()
-                api_key = data.get("apiKey")
-                if not api_key:
-                    raise PluggyError("Pluggy auth retornou sem apiKey", 200, response.text)
-                logger.info("🔑 Pluggy API autenticada com sucesso")
-                return api_key
-            else:
-                logger.error(f"❌ Pluggy auth falhou: {response.status_code} — {response.text}")
-                raise PluggyError(
-                    f"Falha na autenticação Pluggy: {response.status_code}",
-                    response.status_code,
-                    response.text,
-                )
 
     async def _headers(self) -> dict:
         api_key = await self._get_api_key()
@@ -98,16 +112,16 @@ class PluggyClient:
     ) -> dict:
         """Faz request autenticado com retry em 429."""
         headers = await self._headers()
+        client = self._get_http_client()
 
         for attempt in range(retries):
-            async with httpx.AsyncClient(timeout=30) as client:
-                response = await client.request(
-                    method,
-                    f"{self.base_url}{path}",
-                    json=json,
-                    params=params,
-                    headers=headers,
-                )
+            response = await client.request(
+                method,
+                f"{self.base_url}{path}",
+                json=json,
+                params=params,
+                headers=headers,
+            )
 
             if response.status_code == 429:
                 wait = 2 ** attempt
@@ -0,0 +1,59 @@
+"""
+Idempotência de webhooks (AbacatePay, WhatsApp) usando Redis.
+
+Provedores reenviam o mesmo evento em caso de timeout/5xx. Um SET NX EX
+por evento marca a primeira entrega; as repetidas são descartadas com um
+único round-trip ao Redis, sem tocar no banco.
+
+A marcação é feita em duas fases: a primeira entrega reserva a chave com um
+TTL curto (processamento em andamento). Só depois do sucesso a chave passa
+para o TTL longo (`webhook_processed`); se o processamento falhar, a chave é
+liberada (`release_webhook`) e o reenvio do provedor volta a ser processado.
+"""
+
+from loguru import logger
+
+from app.config.redis_client import redis_client
+
+IDEMPOTENCY_TTL_SECONDS = 86400  # 24h
+# Reserva enquanto o evento é processado — se o processo morrer no meio,
+# a chave expira sozinha e o próximo reenvio é aceito
+PROCESSING_TTL_SECONDS = 300
+
+
+def _key(event_id: str) -> str:
+    return f"webhook:{event_id}"
+
+
+async def webhook_idempotent(
+    event_id: str, ttl: int = PROCESSING_TTL_SECONDS
+) -> bool:
+    """
+    Reserva o evento e retorna True na primeira entrega; False se já foi visto
+    (ou está em processamento). Se o Redis estiver indisponível, processa
+    normalmente (fail open).
+    """
+    try:
+        acquired = await redis_client.set(_key(event_id), "1", nx=True, ex=ttl)
+    except Exception as e:
+        logger.warning(f"Checagem de idempotência falhou (Redis): {e}")
+        return True
+    return bool(acquired)
+
+
+async def webhook_processed(
+    event_id: str, ttl: int = IDEMPOTENCY_TTL_SECONDS
+) -> None:
+    """Confirma o evento processado: a chave passa a valer pelo TTL longo."""
+    try:
+        await redis_client.set(_key(event_id), "1", ex=ttl)
+    except Exception as e:
+        logger.warning(f"Falha ao confirmar evento {event_id} (Redis): {e}")
+
+
+async def release_webhook(event_id: str) -> None:
+    """Libera a reserva de um evento cujo processamento falhou."""
+    try:
+        await redis_client.delete(_key(event_id))
+    except Exception as e:
+        logger.warning(f"Falha ao liberar evento {event_id} (Redis): {e}")
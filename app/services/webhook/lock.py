@@ -0,0 +1,64 @@
+"""
+Lock distribuído curto no Redis (SET NX EX + liberação por compare-and-delete).
+
+Serializa eventos concorrentes sobre o mesmo recurso (ex.: a mesma cobrança)
+antes de abrir transação no banco — a espera acontece no Redis, sem segurar
+conexão do pool parada em lock de linha.
+"""
+
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from loguru import logger
+
+from app.config.redis_client import redis_client
+
+LOCK_TTL_SECONDS = 10
+LOCK_WAIT_SECONDS = 5.0
+_RETRY_INTERVAL = 0.1
+
+# Só apaga a chave se ainda for o dono (o TTL pode ter expirado e outro pegou)
+RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_release_script = redis_client.register_script(RELEASE_LUA)
+
+
+@asynccontextmanager
+async def redis_lock(
+    key: str,
+    ttl: int = LOCK_TTL_SECONDS,
+    wait: float = LOCK_WAIT_SECONDS,
+) -> AsyncIterator[bool]:
+    """
+    Tenta obter o lock por até `wait` segundos. Entrega True se obteve;
+    False se esgotou a espera ou o Redis falhou (o chamador segue sem o lock).
+    """
+    token = uuid.uuid4().hex
+    acquired = False
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+
+    try:
+        while not (acquired := bool(await redis_client.set(key, token, nx=True, ex=ttl))):
+            if loop.time() >= deadline:
+                logger.warning(f"Lock {key} não obtido em {wait}s — seguindo sem lock")
+                break
+            await asyncio.sleep(_RETRY_INTERVAL)
+    except Exception as e:
+        logger.warning(f"Lock {key} indisponível (Redis): {e}")
+
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                await _release_script(keys=[key], args=[token])
+            except Exception as e:
+                logger.warning(f"Falha ao liberar lock {key}: {e}")
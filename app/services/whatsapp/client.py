@@ -16,6 +16,8 @@ class WhatsAppClient:
     def __init__(self):
         self.base_url = settings.whatsapp_base_url
         self.phone_id = settings.WHATSAPP_PHONE_NUMBER_ID
+        # Endpoint de envio montado uma vez (todas as mensagens usam o mesmo)
+        self.messages_url = f"{self.base_url}/{self.phone_id}/messages"
         self.headers = {
             "Authorization": f"Bearer {settings.WHATSAPP_ACCESS_TOKEN}",
             "Content-Type": "application/json",
@@ -35,7 +37,7 @@ class WhatsAppClient:
 
     async def send_text(self, to: str, text: str) -> dict:
         """Envia mensagem de texto para o usuário."""
-        url = f"{self.base_url}/{self.phone_id}/messages"
+        url = self.messages_url
         payload = {
             "messaging_product": "whatsapp",
             "recipient_type": "individual",
@@ -65,7 +67,7 @@ class WhatsAppClient:
 
     async def send_image(self, to: str, image_url: str, caption: str = "") -> dict:
         """Envia imagem via URL para o usuário."""
-        url = f"{self.base_url}/{self.phone_id}/messages"
+        url = self.messages_url
         payload = {
             "messaging_product": "whatsapp",
             "recipient_type": "individual",
@@ -83,7 +85,7 @@ class WhatsAppClient:
         self, to: str, document_url: str, filename: str, caption: str = ""
     ) -> dict:
         """Envia documento (PDF, etc.) para o usuário."""
-        url = f"{self.base_url}/{self.phone_id}/messages"
+        url = self.messages_url
         payload = {
             "messaging_product": "whatsapp",
             "recipient_type": "individual",
@@ -114,7 +116,7 @@ class WhatsAppClient:
         Envia mensagem interativa com lista de opções (máx 10 itens).
         sections = [{"title": "Seção", "rows": [{"id": "x", "title": "T", "description": "D"}]}]
         """
-        url = f"{self.base_url}/{self.phone_id}/messages"
+        url = self.messages_url
         payload = {
             "messaging_product": "whatsapp",
             "recipient_type": "individual",
@@ -148,7 +150,7 @@ class WhatsAppClient:
 
     async def mark_as_read(self, message_id: str) -> dict:
         """Marca uma mensagem como lida (blue ticks)."""
-        url = f"{self.base_url}/{self.phone_id}/messages"
+        url = self.messages_url
         payload = {
             "messaging_product": "whatsapp",
             "status": "read",
@@ -3,9 +3,11 @@ Serviço para download de mídia do WhatsApp Cloud API.
 """
 
 import base64
-import httpx
 from loguru import logger
 from app.config.settings import settings
+from app.services.whatsapp.client import WhatsAppClient
+
+_DOWNLOAD_TIMEOUT = 60  # Mídias maiores que as chamadas comuns da API
 
 
 class WhatsAppMedia:
@@ -19,24 +21,28 @@ class WhatsAppMedia:
 
     async def download(self, media_id: str) -> bytes:
         """Baixa mídia pelo media_id do WhatsApp (2 etapas)."""
-        async with httpx.AsyncClient(timeout=60) as client:
-            # Etapa 1: Obter URL da mídia
-            url_response = await client.get(
-                f"{self.base_url}/{media_id}",
-                headers=self.headers,
-            )
-            url_response.raise_for_status()
-            media_url = url_response.json()["url"]
-            logger.info(f"URL da mídia obtida: {media_url}")
-
-            # Etapa 2: Baixar o arquivo
-            media_response = await client.get(
-                media_url,
-                headers=self.headers,
-            )
-            media_response.raise_for_status()
-            logger.info(f"Mídia baixada: {len(media_response.content)} bytes")
-            return media_response.content
+        # Mesmo pool HTTP do WhatsAppClient (keep-alive com graph.facebook.com)
+        client = WhatsAppClient._get_http_client()
+
+        # Etapa 1: Obter URL da mídia
+        url_response = await client.get(
+            f"{self.base_url}/{media_id}",
+            headers=self.headers,
+            timeout=_DOWNLOAD_TIMEOUT,
+        )
+        url_response.raise_for_status()
+        media_url = url_response.json()["url"]
+        logger.info(f"URL da mídia obtida: {media_url}")
+
+        # Etapa 2: Baixar o arquivo
+        media_response = await client.get(
+            media_url,
+            headers=self.headers,
+            timeout=_DOWNLOAD_TIMEOUT,
+        )
+        media_response.raise_for_status()
+        logger.info(f"Mídia baixada: {len(media_response.content)} bytes")
+        return media_response.content
 
     def to_base64(self, image_bytes: bytes) -> str:
         """Converte bytes para base64 string."""
@@ -0,0 +1,38 @@
+"""Add composite indexes for payment lookups by user (pending charge, latest payment).
+
+Revision ID: 006_payment_lookup_indexes
+Revises: 005_add_profile_field
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '006_payment_lookup_indexes'
+down_revision: Union[str, None] = '005_add_profile_field'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY não roda dentro de transação —
+    # não bloqueia escritas em payments durante a criação
+    with op.get_context().autocommit_block():
+        # create_payment_link: WHERE user_id = ? AND status = 'PENDING'
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_payments_user_status "
+            "ON payments(user_id, status)"
+        )
+        # get_payment_status: WHERE user_id = ? ORDER BY created_at DESC LIMIT 1
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_payments_user_created_at "
+            "ON payments(user_id, created_at DESC)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_payments_user_created_at")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_payments_user_status")
@@ -0,0 +1,44 @@
+"""Make the latest-payment index covering (INCLUDE) for index-only scans.
+
+Revision ID: 007_payment_covering_index
+Revises: 006_payment_lookup_indexes
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '007_payment_covering_index'
+down_revision: Union[str, None] = '006_payment_lookup_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Cria o índice novo antes de remover o antigo — a consulta nunca fica sem índice
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_payments_user_created_covering "
+            "ON payments(user_id, created_at DESC) "
+            "INCLUDE (plan_type, billing_period, abacatepay_billing_id, status)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_payments_user_created_at")
+        op.execute(
+            "ALTER INDEX ix_payments_user_created_covering "
+            "RENAME TO ix_payments_user_created_at"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_payments_user_created_plain "
+            "ON payments(user_id, created_at DESC)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_payments_user_created_at")
+        op.execute(
+            "ALTER INDEX ix_payments_user_created_plain "
+            "RENAME TO ix_payments_user_created_at"
+        )
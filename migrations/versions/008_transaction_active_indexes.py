@@ -0,0 +1,45 @@
+"""Replace the plain transactions.user_id index with partial indexes on active rows.
+
+Revision ID: 008_transaction_active_indexes
+Revises: 007_payment_covering_index
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '008_transaction_active_indexes'
+down_revision: Union[str, None] = '007_payment_covering_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Cria os índices novos antes de remover o antigo — as consultas nunca ficam sem índice
+    with op.get_context().autocommit_block():
+        # Relatórios/saldo: WHERE user_id = ? AND deleted_at IS NULL [AND date BETWEEN ...]
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_user_date_active "
+            "ON transactions(user_id, date) "
+            "INCLUDE (type, amount, profile, category_id) "
+            "WHERE deleted_at IS NULL"
+        )
+        # Últimos lançamentos: WHERE user_id = ? AND deleted_at IS NULL ORDER BY created_at DESC
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_user_created_active "
+            "ON transactions(user_id, created_at DESC) "
+            "WHERE deleted_at IS NULL"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_transactions_user_id")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_user_id "
+            "ON transactions(user_id)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_transactions_user_created_active")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_transactions_user_date_active")
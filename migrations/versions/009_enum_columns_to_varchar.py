@@ -0,0 +1,65 @@
+"""Store payment status, transaction type and license type as VARCHAR + CHECK.
+
+Revision ID: 009_enum_columns_to_varchar
+Revises: 008_transaction_active_indexes
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '009_enum_columns_to_varchar'
+down_revision: Union[str, None] = '008_transaction_active_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tabela, coluna, tipo ENUM antigo, valores aceitos, default)
+_COLUMNS = (
+    ("payments", "status", "paymentstatus",
+     ("PENDING", "PAID", "EXPIRED", "CANCELLED", "REFUNDED"), "PENDING"),
+    ("transactions", "type", "transactiontype",
+     ("INCOME", "EXPENSE"), None),
+    ("users", "license_type", "licensetype",
+     ("FREE_TRIAL", "BASICO", "PRO", "PREMIUM"), "FREE_TRIAL"),
+)
+
+
+def _in_list(values: tuple[str, ...]) -> str:
+    return ", ".join(f"'{v}'" for v in values)
+
+
+def upgrade() -> None:
+    # Novos valores passam a ser só um ALTER ... CHECK, sem ALTER TYPE bloqueante
+    for table, column, enum_type, values, default in _COLUMNS:
+        if default:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} DROP DEFAULT")
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN {column} "
+            f"TYPE VARCHAR(20) USING {column}::text"
+        )
+        if default:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT '{default}'")
+        op.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT ck_{table}_{column} "
+            f"CHECK ({column} IN ({_in_list(values)}))"
+        )
+        op.execute(f"DROP TYPE IF EXISTS {enum_type}")
+
+
+def downgrade() -> None:
+    for table, column, enum_type, values, default in _COLUMNS:
+        op.execute(
+            f"DO $$ BEGIN CREATE TYPE {enum_type} AS ENUM ({_in_list(values)}); "
+            f"EXCEPTION WHEN duplicate_object THEN NULL; END $$;"
+        )
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS ck_{table}_{column}")
+        if default:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} DROP DEFAULT")
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN {column} "
+            f"TYPE {enum_type} USING {column}::{enum_type}"
+        )
+        if default:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT '{default}'")
@@ -0,0 +1,37 @@
+"""Add categories.name_norm (lower(name), generated) with a b-tree lookup index.
+
+Revision ID: 010_category_name_norm
+Revises: 009_enum_columns_to_varchar
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '010_category_name_norm'
+down_revision: Union[str, None] = '009_enum_columns_to_varchar'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Coluna gerada pelo próprio Postgres — sempre em sincronia com name
+    op.execute(
+        "ALTER TABLE categories ADD COLUMN IF NOT EXISTS name_norm VARCHAR(50) "
+        "GENERATED ALWAYS AS (lower(name)) STORED"
+    )
+    with op.get_context().autocommit_block():
+        # find_or_create/create_custom/delete_custom:
+        # WHERE name_norm = lower(?) AND (user_id IS NULL OR user_id = ?)
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_categories_name_norm_user "
+            "ON categories(name_norm, user_id)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_categories_name_norm_user")
+    op.execute("ALTER TABLE categories DROP COLUMN IF EXISTS name_norm")
@@ -0,0 +1,31 @@
+"""Restore the plain transactions.user_id index next to the partial active-row indexes.
+
+Revision ID: 011_transaction_user_id_index
+Revises: 010_category_name_norm
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '011_transaction_user_id_index'
+down_revision: Union[str, None] = '010_category_name_norm'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Os índices parciais (deleted_at IS NULL) não servem à checagem da FK ao
+    # apagar usuário nem a consultas por user_id sem filtro em deleted_at
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_user_id "
+            "ON transactions(user_id)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_transactions_user_id")
@@ -0,0 +1,64 @@
+"""
+Fixtures compartilhadas pelos testes.
+"""
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401 — registra os models no metadata
+import app.models.payment  # noqa: F401
+from app.config.database import Base
+
+
+@pytest.fixture
+async def db_session():
+    """Fábrica de sessões sobre um SQLite em memória com o schema dos models."""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+class FakeRedis:
+    """Redis mínimo em memória (SET NX EX / DELETE) para os módulos de webhook."""
+
+    def __init__(self, fail: bool = False):
+        self.data: dict[str, str] = {}
+        self.ttls: dict[str, int] = {}
+        self.fail = fail
+
+    def _check(self):
+        if self.fail:
+            raise ConnectionError("Redis indisponível")
+
+    async def set(self, key, value, nx=False, ex=None):
+        self._check()
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        self.ttls[key] = ex
+        return True
+
+    async def delete(self, key):
+        self._check()
+        self.ttls.pop(key, None)
+        return int(self.data.pop(key, None) is not None)
+
+    async def release_if_owner(self, keys, args):
+        """Equivalente ao RELEASE_LUA de app.services.webhook.lock."""
+        self._check()
+        if self.data.get(keys[0]) == args[0]:
+            return await self.delete(keys[0])
+        return 0
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
+
+
+@pytest.fixture
+def broken_redis():
+    return FakeRedis(fail=True)
@@ -0,0 +1,152 @@
+"""
+Testes para a idempotência e o lock de webhooks (Redis).
+"""
+
+import pytest
+
+from app.api.routes import webhook as webhook_routes
+from app.services.webhook import idempotency, lock
+from app.services.webhook.idempotency import (
+    IDEMPOTENCY_TTL_SECONDS,
+    PROCESSING_TTL_SECONDS,
+    release_webhook,
+    webhook_idempotent,
+    webhook_processed,
+)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def redis(monkeypatch, fake_redis):
+    monkeypatch.setattr(idempotency, "redis_client", fake_redis)
+    monkeypatch.setattr(lock, "redis_client", fake_redis)
+    monkeypatch.setattr(lock, "_release_script", fake_redis.release_if_owner)
+    return fake_redis
+
+
+@pytest.mark.anyio
+async def test_first_delivery_reserves_with_short_ttl(redis):
+    assert await webhook_idempotent("evt-1") is True
+    assert await webhook_idempotent("evt-1") is False
+    assert redis.ttls["webhook:evt-1"] == PROCESSING_TTL_SECONDS
+
+
+@pytest.mark.anyio
+async def test_processed_keeps_key_for_long_ttl(redis):
+    await webhook_idempotent("evt-1")
+    await webhook_processed("evt-1")
+    assert redis.ttls["webhook:evt-1"] == IDEMPOTENCY_TTL_SECONDS
+    assert await webhook_idempotent("evt-1") is False
+
+
+@pytest.mark.anyio
+async def test_release_allows_redelivery(redis):
+    await webhook_idempotent("evt-1")
+    await release_webhook("evt-1")
+    assert await webhook_idempotent("evt-1") is True
+
+
+@pytest.mark.anyio
+async def test_idempotency_fails_open(monkeypatch, broken_redis):
+    monkeypatch.setattr(idempotency, "redis_client", broken_redis)
+    assert await webhook_idempotent("evt-1") is True
+    assert await webhook_idempotent("evt-1") is True
+    # Confirmar/liberar com Redis fora do ar só gera aviso
+    await webhook_processed("evt-1")
+    await release_webhook("evt-1")
+
+
+@pytest.mark.anyio
+async def test_lock_acquire_and_release(redis):
+    async with lock.redis_lock("lock:x") as acquired:
+        assert acquired is True
+        assert "lock:x" in redis.data
+        async with lock.redis_lock("lock:x", wait=0.05) as second:
+            assert second is False
+    assert "lock:x" not in redis.data
+
+
+@pytest.mark.anyio
+async def test_lock_release_only_by_owner(redis):
+    async with lock.redis_lock("lock:x") as acquired:
+        assert acquired is True
+        # TTL expirou e outro processo pegou o lock
+        redis.data["lock:x"] = "outro-dono"
+    assert redis.data["lock:x"] == "outro-dono"
+
+
+@pytest.mark.anyio
+async def test_lock_fails_open(monkeypatch, broken_redis):
+    monkeypatch.setattr(lock, "redis_client", broken_redis)
+    monkeypatch.setattr(lock, "_release_script", broken_redis.release_if_owner)
+    async with lock.redis_lock("lock:x") as acquired:
+        assert acquired is False
+
+
+# --- Dedupe em volta do pipeline do WhatsApp ---
+
+
+def _text_payload(message_id: str = "wamid.1") -> dict:
+    return {
+        "entry": [{
+            "changes": [{
+                "value": {
+                    "contacts": [{"profile": {"name": "Teste"}, "wa_id": "5511999990000"}],
+                    "messages": [{
+                        "from": "5511999990000",
+                        "id": message_id,
+                        "timestamp": "0",
+                        "type": "text",
+                        "text": {"body": "oi"},
+                    }],
+                },
+            }],
+        }],
+    }
+
+
+@pytest.mark.anyio
+async def test_whatsapp_message_confirmed_after_reply(redis, monkeypatch):
+    handled = []
+
+    async def _handle(message, on_processing=None):
+        handled.append(message.message_id)
+
+    monkeypatch.setattr(webhook_routes, "_handle_message", _handle)
+
+    await webhook_routes._process_webhook(_text_payload())
+    await webhook_routes._process_webhook(_text_payload())
+
+    assert handled == ["wamid.1"]
+    assert redis.ttls["webhook:whatsapp:wamid.1"] == IDEMPOTENCY_TTL_SECONDS
+
+
+@pytest.mark.anyio
+async def test_whatsapp_failure_releases_message(redis, monkeypatch):
+    async def _boom(message, on_processing=None):
+        raise RuntimeError("LLM fora do ar")
+
+    monkeypatch.setattr(webhook_routes, "_handle_message", _boom)
+
+    with pytest.raises(RuntimeError):
+        await webhook_routes._process_webhook(_text_payload())
+    assert "webhook:whatsapp:wamid.1" not in redis.data
+
+
+@pytest.mark.anyio
+async def test_whatsapp_failure_after_processing_keeps_message(redis, monkeypatch):
+    """Falha depois do MCP (ex.: envio da resposta) não libera o reenvio."""
+    async def _reply_fails(message, on_processing=None):
+        await on_processing()
+        raise RuntimeError("Graph API fora do ar")
+
+    monkeypatch.setattr(webhook_routes, "_handle_message", _reply_fails)
+
+    with pytest.raises(RuntimeError):
+        await webhook_routes._process_webhook(_text_payload())
+    assert redis.ttls["webhook:whatsapp:wamid.1"] == IDEMPOTENCY_TTL_SECONDS
+    assert await webhook_idempotent("whatsapp:wamid.1") is False
@@ -0,0 +1,287 @@
+"""
+Testes para o webhook de pagamento (AbacatePay).
+"""
+
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import BackgroundTasks
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import select
+from sqlalchemy.orm import lazyload
+
+from app.api.routes import payment as payment_routes
+from app.api.routes.payment import _billing_id, _first, _process_billing_event
+from app.main import app
+from app.models.payment import Payment, PaymentStatus
+from app.models.user import LicenseType, User
+from app.schemas.payment import AbacatePayWebhookEvent
+from app.services.webhook import idempotency
+from app.services.webhook.idempotency import IDEMPOTENCY_TTL_SECONDS
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
+
+
+def _webhook_url() -> str:
+    from app.config.settings import settings
+
+    return f"/webhooks/abacatepay?webhookSecret={settings.ABACATEPAY_WEBHOOK_SECRET}"
+
+
+def test_event_coerces_numeric_fields():
+    """id/status numéricos não invalidam o evento."""
+    event = AbacatePayWebhookEvent.model_validate_json(
+        b'{"event": "billing.paid", "id": 123, "status": 1, "data": []}'
+    )
+    assert event.id == "123"
+    assert event.status == "1"
+    assert event.data == {}
+
+
+@pytest.mark.anyio
+async def test_webhook_malformed_json(client: AsyncClient):
+    """JSON malformado → 400."""
+    response = await client.post(_webhook_url(), content=b"{not json")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid JSON"
+
+
+@pytest.mark.anyio
+async def test_webhook_invalid_payload(client: AsyncClient):
+    """JSON válido fora do formato esperado → 422."""
+    response = await client.post(_webhook_url(), content=b"[1, 2]")
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Invalid payload"
+
+
+# --- Processamento de eventos (transições de estado) ---
+
+
+class _BillingEnv:
+    """Banco/Redis do teste + chamadas feitas aos serviços externos (subscriptions/WhatsApp)."""
+
+    def __init__(self, session, redis):
+        self.session = session
+        self.redis = redis
+        self.synced: list[dict] = []
+        self.notified: list[tuple] = []
+
+    async def sync_from_payment(self, **kwargs):
+        self.synced.append(kwargs)
+
+    async def notify(self, phone, plan_display):
+        self.notified.append((phone, plan_display))
+
+
+@asynccontextmanager
+async def _no_lock(key, *args, **kwargs):
+    yield True
+
+
+@pytest.fixture
+def billing_env(monkeypatch, db_session, fake_redis):
+    """Webhook de pagamento sobre SQLite em memória e Redis falso."""
+    env = _BillingEnv(db_session, fake_redis)
+    monkeypatch.setattr(payment_routes, "async_session", db_session)
+    monkeypatch.setattr(payment_routes, "redis_lock", _no_lock)
+    monkeypatch.setattr(idempotency, "redis_client", fake_redis)
+    monkeypatch.setattr(payment_routes, "_subscriptions", lambda: env)
+    monkeypatch.setattr(payment_routes, "_notify_upgrade", env.notify)
+    return env
+
+
+async def _seed_pending_payment(db_session, billing_id="bill_1") -> uuid.UUID:
+    user_id = uuid.uuid4()
+    async with db_session.begin() as session:
+        session.add(User(id=user_id, phone="5511999990000", name="Teste"))
+        await session.flush()
+        session.add(Payment(
+            user_id=user_id,
+            abacatepay_billing_id=billing_id,
+            amount_cents=1990,
+            plan_type="PRO",
+            billing_period="MONTHLY",
+            status=PaymentStatus.PENDING,
+        ))
+    return user_id
+
+
+async def _load(db_session, user_id):
+    async with db_session() as session:
+        user = await session.get(User, user_id, options=[lazyload("*")])
+        payment = await session.scalar(select(Payment).where(Payment.user_id == user_id))
+    return user, payment
+
+
+def _event(event_type: str, billing_id: str = "bill_1", status: str = "PAID"):
+    return AbacatePayWebhookEvent.model_validate(
+        {"event": event_type, "data": {"billing": {"id": billing_id, "status": status}}}
+    )
+
+
+def test_first_priority_and_fallback():
+    """Cada chave é procurada em todos os dicts antes da próxima; vazios são ignorados."""
+    customer = {"cellphone": "", "phone": "111"}
+    metadata = {"cellphone": "222"}
+    assert _first((customer, metadata), "cellphone", "phone") == "222"
+    assert _first((customer, metadata), "phone") == "111"
+    assert _first((customer, metadata), "email", default="x") == "x"
+
+
+def test_billing_id_fallback():
+    nested = AbacatePayWebhookEvent.model_validate({"data": {"billing": {"id": "b1"}}, "id": "top"})
+    flat = AbacatePayWebhookEvent.model_validate({"data": {"id": "b2"}})
+    top = AbacatePayWebhookEvent.model_validate({"id": "b3", "data": None})
+    assert (_billing_id(nested), _billing_id(flat), _billing_id(top)) == ("b1", "b2", "b3")
+
+
+@pytest.mark.anyio
+async def test_paid_event_upgrades_user_once(billing_env):
+    user_id = await _seed_pending_payment(billing_env.session)
+
+    # "billing.paid" com status ainda ACTIVE é tratado como PAID
+    tasks = BackgroundTasks()
+    result = await _process_billing_event(_event("billing.paid", status="ACTIVE"), tasks)
+    assert result == {"status": "processed", "billing_id": "bill_1"}
+    await tasks()
+
+    user, payment = await _load(billing_env.session, user_id)
+    assert payment.status == PaymentStatus.PAID
+    assert payment.paid_at is not None
+    assert user.license_type == LicenseType.PRO
+    assert user.license_expires_at is not None
+    assert billing_env.synced == [
+        {"user_id": str(user_id), "plan_type": "PRO", "billing_period": "MONTHLY"}
+    ]
+    assert billing_env.notified == [("5511999990000", "Pro")]
+    assert billing_env.redis.ttls["webhook:abacatepay:bill_1:PAID"] == IDEMPOTENCY_TTL_SECONDS
+
+    # Outra entrega do mesmo pagamento (outra chave) não repete o upgrade
+    tasks = BackgroundTasks()
+    await _process_billing_event(_event("billing.paid"), tasks, idempotency_key="retry-2")
+    assert not tasks.tasks
+    assert len(billing_env.synced) == 1
+    assert len(billing_env.notified) == 1
+
+
+@pytest.mark.anyio
+async def test_upgrade_notification_runs_after_response(billing_env):
+    """Assinatura e WhatsApp ficam agendados — nada sai antes da resposta."""
+    await _seed_pending_payment(billing_env.session)
+
+    tasks = BackgroundTasks()
+    await _process_billing_event(_event("billing.paid"), tasks)
+    assert billing_env.synced == []
+    assert billing_env.notified == []
+    # Chave confirmada já no commit, antes das tarefas pós-resposta
+    assert billing_env.redis.ttls["webhook:abacatepay:bill_1:PAID"] == IDEMPOTENCY_TTL_SECONDS
+
+    await tasks()
+    assert len(billing_env.synced) == 1
+    assert billing_env.notified == [("5511999990000", "Pro")]
+
+
+@pytest.mark.anyio
+async def test_expired_event_updates_status_without_upgrade(billing_env):
+    user_id = await _seed_pending_payment(billing_env.session)
+
+    tasks = BackgroundTasks()
+    await _process_billing_event(_event("billing.expired", status="EXPIRED"), tasks)
+    assert not tasks.tasks
+
+    user, payment = await _load(billing_env.session, user_id)
+    assert payment.status == PaymentStatus.EXPIRED
+    assert payment.paid_at is None
+    assert user.license_type == LicenseType.FREE_TRIAL
+    assert billing_env.synced == []
+    assert billing_env.notified == []
+
+
+@pytest.mark.anyio
+async def test_pending_event_on_pending_payment_is_noop(billing_env, monkeypatch):
+    """Atalho PENDING: só a leitura leve — sem lock, sem transação, sem escrita."""
+    user_id = await _seed_pending_payment(billing_env.session)
+    _, before = await _load(billing_env.session, user_id)
+
+    @asynccontextmanager
+    async def _forbidden_lock(key, *args, **kwargs):
+        raise AssertionError(f"lock {key} não deveria ser adquirido")
+        yield
+
+    class _ReadOnlySessions:
+        """Permite sessões de leitura; falha se o atalho abrir uma transação."""
+
+        def __call__(self):
+            return billing_env.session()
+
+        def begin(self):
+            raise AssertionError("transação não deveria ser aberta")
+
+    monkeypatch.setattr(payment_routes, "redis_lock", _forbidden_lock)
+    monkeypatch.setattr(payment_routes, "async_session", _ReadOnlySessions())
+
+    result = await _process_billing_event(
+        _event("billing.created", status="PENDING"), BackgroundTasks()
+    )
+    assert result == {"status": "processed", "billing_id": "bill_1"}
+
+    _, after = await _load(billing_env.session, user_id)
+    assert after.status == PaymentStatus.PENDING
+    assert after.updated_at == before.updated_at
+
+
+@pytest.mark.anyio
+async def test_unknown_billing_without_phone_is_not_found(billing_env):
+    result = await _process_billing_event(_event("billing.paid", billing_id="bill_x"), BackgroundTasks())
+    assert result == {"status": "not_found", "reason": "no_phone"}
+
+
+@pytest.mark.anyio
+async def test_customer_phone_field_is_not_a_phone_source(billing_env):
+    """Telefone só vem de customer.cellphone, metadata.cellphone ou metadata.phone."""
+    event = AbacatePayWebhookEvent.model_validate({
+        "event": "billing.paid",
+        "data": {"billing": {"id": "bill_x", "customer": {"phone": "11988887777"}}},
+    })
+    result = await _process_billing_event(event, BackgroundTasks())
+    assert result == {"status": "not_found", "reason": "no_phone"}
+
+
+@pytest.mark.anyio
+async def test_webhook_reports_event_outcome(billing_env, client: AsyncClient):
+    """A resposta do webhook reflete o resultado: ignored, processed, duplicate."""
+    await _seed_pending_payment(billing_env.session)
+
+    response = await client.post(_webhook_url(), content=b'{"event": "billing.paid", "data": {}}')
+    assert response.status_code == 200
+    assert response.json() == {"status": "ignored"}
+
+    body = b'{"event": "billing.paid", "data": {"billing": {"id": "bill_1", "status": "PAID"}}}'
+    response = await client.post(_webhook_url(), content=body)
+    assert response.json() == {"status": "processed", "billing_id": "bill_1"}
+
+    response = await client.post(_webhook_url(), content=body + b" ")
+    assert response.json() == {"status": "duplicate", "billing_id": "bill_1"}
+
+
+@pytest.mark.anyio
+async def test_failed_event_releases_dedupe_key(billing_env, monkeypatch):
+    async def _boom(*args, **kwargs):
+        raise RuntimeError("banco fora do ar")
+
+    monkeypatch.setattr(payment_routes, "_apply_billing_event", _boom)
+
+    with pytest.raises(RuntimeError):
+        await _process_billing_event(_event("billing.paid"), BackgroundTasks())
+    assert "webhook:abacatepay:bill_1:PAID" not in billing_env.redis.data
@@ -0,0 +1,119 @@
+"""
+Testes para a detecção de plano por texto no webhook do WhatsApp.
+"""
+
+import random
+import re
+
+import pytest
+
+from app.api.routes.webhook import (
+    _detect_plan_selection,
+    _is_plan_inquiry,
+    _might_be_plan_text,
+    _normalize,
+)
+
+# Referência: os padrões originais, avaliados um a um sem pré-filtro —
+# a regex fatorada + filtro por substring precisa dar o mesmo resultado
+_REFERENCE_ANNUAL = r"\banual\b|\banuais\b|\bannual\b"
+_REFERENCE_MONTHLY = (
+    r"\bplano\s+mensal\b|\bmensal\b|\bassinar\b|\bquero\s+(o\s+)?mensal\b|\bquero\s+(o\s+)?plano\b"
+)
+_REFERENCE_INQUIRY = [
+    r"\bplanos?\b",
+    r"\bupgrade\b",
+    r"\bassinatura\b",
+    r"\bassinar\b",
+    r"\bquanto\s+custa\b",
+    r"\bmudar\s+plano\b",
+    r"\btrocar\s+plano\b",
+    r"\bmelhorar\s+plano\b",
+    r"\bquero\s+(fazer\s+)?upgrade\b",
+    r"\bver\s+(os\s+)?planos?\b",
+    r"\bsaber\s+(os\s+)?planos?\b",
+    r"\bconhecer\s+(os\s+)?planos?\b",
+    r"\bquais\s+(sao\s+)?(os\s+)?planos?\b",
+    r"\bopcoes\s+de\s+plano\b",
+    r"\bplanos\s+disponiveis\b",
+]
+
+_VOCABULARY = [
+    "quero", "o", "os", "plano", "planos", "planeta", "mensal", "mensalidade",
+    "anual", "anuais", "annual", "anualmente", "assinar", "assinatura", "assina",
+    "upgrade", "upgrades", "quanto", "custa", "custo", "ver", "mudar", "trocar",
+    "opções", "de", "disponíveis", "gastei", "50", "reais", "no", "mercado",
+    "mês", "pro", "R$", "🛒", "Plano", "MENSAL", "Anual", ",", ".", "?",
+]
+
+
+def _reference_selection(t: str) -> tuple[str, str] | None:
+    if re.search(_REFERENCE_ANNUAL, t):
+        return ("PRO", "ANNUAL")
+    if re.search(_REFERENCE_MONTHLY, t):
+        return ("PRO", "MONTHLY")
+    return None
+
+
+def _reference_inquiry(t: str) -> bool:
+    return any(re.search(p, t) for p in _REFERENCE_INQUIRY)
+
+
+def _phrases(n: int = 5000, seed: int = 42):
+    rng = random.Random(seed)
+    for _ in range(n):
+        words = rng.choices(_VOCABULARY, k=rng.randint(1, 6))
+        yield rng.choice((" ", "  ", "")).join(words)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Quero o plano anual", ("PRO", "ANNUAL")),
+        ("planos anuais?", ("PRO", "ANNUAL")),
+        ("quero o mensal", ("PRO", "MONTHLY")),
+        ("Quero assinar", ("PRO", "MONTHLY")),
+        ("gastei 50 reais no mercado este mês", None),
+        ("vou pro mercado", None),
+        ("mensalidade da escola", None),
+    ],
+)
+def test_detect_plan_selection(text, expected):
+    assert _detect_plan_selection(_normalize(text)) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Quais são os planos?", True),
+        ("quero fazer upgrade", True),
+        ("Quanto custa?", True),
+        ("como funciona a assinatura", True),
+        ("Opções de plano", True),
+        ("gastei 30 no planeta gelado", False),
+        ("custa caro o mercado", False),
+    ],
+)
+def test_is_plan_inquiry(text, expected):
+    assert _is_plan_inquiry(_normalize(text)) is expected
+
+
+def test_normalize():
+    assert _normalize("  Opções DE Plano ") == "opcoes de plano"
+    assert _normalize("Assinatura Mensal") == "assinatura mensal"
+    assert _normalize("Ação à vista, é já") == "acao a vista, e ja"
+
+
+def test_might_be_plan_text():
+    assert _might_be_plan_text("plano")
+    assert not _might_be_plan_text("50")
+    assert not _might_be_plan_text("ok")
+    assert not _might_be_plan_text("🛒💸 120,00")
+
+
+def test_prefilter_matches_reference_patterns():
+    """Regex fatorada + filtro por substring ≡ padrões originais, frase a frase."""
+    for phrase in _phrases():
+        t = _normalize(phrase)
+        assert _detect_plan_selection(t) == _reference_selection(t), phrase
+        assert _is_plan_inquiry(t) == _reference_inquiry(t), phrase
@@ -0,0 +1,139 @@
+"""
+Testes para os relatórios financeiros (agregação no banco).
+"""
+
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from app.models.category import Category
+from app.models.transaction import Transaction, TransactionProfile, TransactionType
+from app.models.user import User
+from app.services.finance import report_service
+from app.services.finance.report_service import ReportService
+
+JAN_START = date(2026, 1, 1)
+JAN_END = date(2026, 1, 31)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def user_id(monkeypatch, db_session):
+    """Usuário com lançamentos em janeiro (PF/PJ, com e sem categoria) + ruído."""
+    monkeypatch.setattr(report_service, "async_session", db_session)
+    uid, other = uuid.uuid4(), uuid.uuid4()
+    mercado, lazer = uuid.uuid4(), uuid.uuid4()
+
+    def tx(tx_type, amount, day, category_id=None, profile="PF", **kwargs):
+        return Transaction(
+            user_id=kwargs.pop("owner", uid),
+            type=tx_type,
+            amount=Decimal(amount),
+            description=f"{tx_type.value} {amount}",
+            date=day,
+            category_id=category_id,
+            profile=TransactionProfile(profile),
+            **kwargs,
+        )
+
+    expense, income = TransactionType.EXPENSE, TransactionType.INCOME
+    async with db_session.begin() as session:
+        session.add_all([
+            User(id=uid, phone="5511999990001", name="Teste"),
+            User(id=other, phone="5511999990002", name="Outro"),
+            Category(id=mercado, name="Mercado", emoji="🛒"),
+            Category(id=lazer, name="Lazer", emoji="🎉"),
+        ])
+        await session.flush()
+        session.add_all([
+            tx(expense, "100.00", date(2026, 1, 10), mercado),
+            tx(expense, "50.00", date(2026, 1, 20), mercado, profile="PJ"),
+            tx(expense, "30.00", date(2026, 1, 15), lazer),
+            tx(expense, "20.00", date(2026, 1, 5)),
+            tx(income, "1000.00", date(2026, 1, 5)),
+            tx(income, "500.00", date(2026, 1, 6), profile="PJ"),
+            # Fora do relatório: removido, fora do período, de outro usuário
+            tx(expense, "999.00", date(2026, 1, 12), mercado, deleted_at=datetime(2026, 1, 13)),
+            tx(expense, "77.00", date(2026, 2, 1), mercado),
+            tx(expense, "88.00", date(2026, 1, 12), mercado, owner=other),
+        ])
+    return str(uid)
+
+
+@pytest.mark.anyio
+async def test_period_report_consolidated(user_id):
+    report = await ReportService().generate_period_report(user_id, JAN_START, JAN_END)
+
+    assert report["total_income"] == 1500.0
+    assert report["total_expense"] == 200.0
+    assert report["balance"] == 1300.0
+    assert report["transaction_count"] == 6
+    assert report["by_category"] == [
+        {"name": "Mercado", "emoji": "🛒", "total": 150.0, "count": 2},
+        {"name": "Lazer", "emoji": "🎉", "total": 30.0, "count": 1},
+        {"name": "Sem categoria", "emoji": "📦", "total": 20.0, "count": 1},
+    ]
+    assert report["by_profile"] == {
+        "PF": {"total_income": 1000.0, "total_expense": 150.0, "balance": 850.0},
+        "PJ": {"total_income": 500.0, "total_expense": 50.0, "balance": 450.0},
+    }
+
+
+@pytest.mark.anyio
+async def test_period_report_by_profile(user_id):
+    report = await ReportService().generate_period_report(
+        user_id, JAN_START, JAN_END, profile="PF"
+    )
+
+    assert report["total_income"] == 1000.0
+    assert report["total_expense"] == 150.0
+    assert report["transaction_count"] == 4
+    assert [c["total"] for c in report["by_category"]] == [100.0, 30.0, 20.0]
+    assert "by_profile" not in report
+
+
+@pytest.mark.anyio
+async def test_category_report_percentages(user_id):
+    categories = await ReportService().generate_category_report(user_id, JAN_START, JAN_END)
+
+    assert [
+        (c["name"], c["total"], c["count"], c["average"], c["percentage"])
+        for c in categories
+    ] == [
+        ("Mercado", 150.0, 2, 75.0, 75.0),
+        ("Lazer", 30.0, 1, 30.0, 15.0),
+        ("Sem categoria", 20.0, 1, 20.0, 10.0),
+    ]
+
+
+@pytest.mark.anyio
+async def test_category_report_filter_lists_recent_transactions(user_id):
+    categories = await ReportService().generate_category_report(
+        user_id, JAN_START, JAN_END, category_filter="merc"
+    )
+
+    assert len(categories) == 1
+    assert categories[0]["percentage"] == 100.0
+    assert [(t["amount"], t["date"]) for t in categories[0]["transactions"]] == [
+        (50.0, date(2026, 1, 20)),
+        (100.0, date(2026, 1, 10)),
+    ]
+
+
+@pytest.mark.anyio
+async def test_reports_empty_period(user_id):
+    service = ReportService()
+    report = await service.generate_period_report(user_id, date(2025, 1, 1), date(2025, 1, 31))
+
+    assert report["total_income"] == report["total_expense"] == 0.0
+    assert report["transaction_count"] == 0
+    assert report["by_category"] == []
+    assert await service.generate_category_report(
+        user_id, date(2025, 1, 1), date(2025, 1, 31)
+    ) == []
@@ -2,9 +2,16 @@
 Testes para o endpoint de webhook.
 """
 
+import uuid
+from types import SimpleNamespace
+
 import pytest
 from httpx import AsyncClient, ASGITransport
+from app.api.routes import webhook as webhook_routes
 from app.main import app
+from app.models.user import LicenseType
+from app.schemas.webhook import ParsedMessage
+from app.services.mcp.processor import MCPResponse
 
 
 @pytest.fixture
@@ -93,3 +100,104 @@ async def test_root(client: AsyncClient):
     response = await client.get("/")
     assert response.status_code == 200
     assert "SuvFin" in response.json()["message"]
+
+
+@pytest.mark.anyio
+async def test_upgrade_page_etag(client: AsyncClient):
+    """Testa a revalidação da página de upgrade (ETag / If-None-Match)."""
+    response = await client.get("/upgrade")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    for if_none_match in (etag, f'"outro", {etag}', f"W/{etag}", "*"):
+        response = await client.get("/upgrade", headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304, if_none_match
+
+    response = await client.get("/upgrade", headers={"If-None-Match": '"outro"'})
+    assert response.status_code == 200
+
+
+# --- Pipeline de resposta (_handle_message) ---
+
+
+class _FakeWhatsApp:
+    """Cliente WhatsApp que só registra a ordem dos envios."""
+
+    def __init__(self, fail_text: bool = False):
+        self.calls: list[str] = []
+        self.fail_text = fail_text
+
+    async def mark_as_read(self, message_id):
+        self.calls.append("read")
+
+    async def send_text(self, phone, text):
+        if self.fail_text:
+            raise RuntimeError("Graph API fora do ar")
+        self.calls.append("text")
+
+    async def send_image(self, phone, media, caption=None):
+        self.calls.append("image")
+
+    async def send_document(self, phone, media, filename, caption=None):
+        self.calls.append("document")
+
+
+def _pipeline(monkeypatch, client: _FakeWhatsApp, response: MCPResponse) -> list[str]:
+    """Troca os serviços do pipeline por fakes; devolve a lista de etapas executadas."""
+    steps: list[str] = []
+    user = SimpleNamespace(
+        id=uuid.uuid4(), is_license_valid=True, license_type=LicenseType.PRO
+    )
+
+    async def _get_or_create_user(phone, name):
+        return user, False
+
+    async def _process(**kwargs):
+        steps.append("process")
+        return response
+
+    async def _persist(**kwargs):
+        pass
+
+    monkeypatch.setattr(webhook_routes, "_whatsapp", lambda: client)
+    monkeypatch.setattr(
+        webhook_routes, "_license",
+        lambda: SimpleNamespace(get_or_create_user=_get_or_create_user),
+    )
+    monkeypatch.setattr(
+        webhook_routes, "_processor", lambda: SimpleNamespace(process=_process)
+    )
+    monkeypatch.setattr(
+        webhook_routes, "_messages",
+        lambda: SimpleNamespace(persist_bot_message=_persist),
+    )
+    return steps
+
+
+def _message(message_id: str = "wamid.1") -> ParsedMessage:
+    return ParsedMessage(
+        phone="5511999990000", name="Teste", message_id=message_id,
+        type="text", content="quanto gastei este mês?", timestamp="0",
+    )
+
+
+@pytest.mark.anyio
+async def test_reply_text_sent_before_media(monkeypatch):
+    """O texto que apresenta o gráfico chega antes da mídia."""
+    client = _FakeWhatsApp()
+    _pipeline(monkeypatch, client, MCPResponse(text="Seu gráfico:", media=b"png", media_type="image/png"))
+
+    await webhook_routes._handle_message(_message())
+
+    assert client.calls == ["read", "text", "image"]
+
+
+@pytest.mark.anyio
+async def test_media_not_sent_when_text_fails(monkeypatch):
+    client = _FakeWhatsApp(fail_text=True)
+    _pipeline(monkeypatch, client, MCPResponse(text="Seu PDF:", media=b"%PDF", media_type="application/pdf"))
+
+    with pytest.raises(RuntimeError):
+        await webhook_routes._handle_message(_message())
+
+    assert "document" not in client.calls